@@ -0,0 +1,116 @@
+import chess
+from data import PIECE_VALUES
+
+# Exchange values indexed by piece type (the king can never really be captured)
+SEE_VALUES = [0] + [PIECE_VALUES[piece_type] for piece_type in chess.PIECE_TYPES]
+
+
+def attackers_mask(board: chess.Board, color, square, occupied):
+    # Like board.attackers_mask, but against an arbitrary occupancy so that
+    # pieces removed during an exchange reveal the sliders behind them (x-rays)
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+
+    attackers = (
+        (chess.BB_KING_ATTACKS[square] & board.kings) |
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights) |
+        (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & queens_and_bishops) |
+        (chess.BB_PAWN_ATTACKS[not color][square] & board.pawns)
+    )
+    return attackers & board.occupied_co[color] & occupied
+
+
+def least_valuable_attacker(board, color, attackers):
+    for piece_type in chess.PIECE_TYPES:
+        candidates = attackers & board.pieces_mask(piece_type, color)
+        if candidates:
+            return chess.lsb(candidates), piece_type
+    return None, None
+
+
+def see(board: chess.Board, move: chess.Move) -> int:
+    # Static exchange evaluation of *move* (in material units) for the side to move,
+    # assuming both sides keep recapturing on the target square with their cheapest piece.
+    to_square = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+
+    victim = board.piece_type_at(to_square)
+    if victim is None and board.is_en_passant(move):
+        victim = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+
+    gains = [SEE_VALUES[victim] if victim else 0]
+    on_square = move.promotion or board.piece_type_at(move.from_square)
+    if move.promotion:
+        gains[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+
+    side = not board.turn
+    while True:
+        attackers = attackers_mask(board, side, to_square, occupied)
+        if not attackers:
+            break
+        square, piece_type = least_valuable_attacker(board, side, attackers)
+        # Speculative score for *side* if the exchange stopped after this capture
+        gains.append(SEE_VALUES[on_square] - gains[-1])
+        on_square = piece_type
+        occupied ^= chess.BB_SQUARES[square]
+        side = not side
+
+    # Unwind: each side may decline to continue the exchange
+    for depth in range(len(gains) - 1, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return gains[0]
+
+
+class AttackMap:
+    # Attack information of one position, shared by all evaluation terms of a node.
+    # Everything is computed lazily on first use and then reused.
+    def __init__(self, board: chess.Board):
+        self.board = board
+        self._attacks = [None, None]  # Indexed by color
+        self._pawn_attacks = [None, None]
+        self._attacker_counts = [None, None]
+
+    def pawn_attacks(self, color):
+        attacks = self._pawn_attacks[color]
+        if attacks is None:
+            pawns = self.board.pawns & self.board.occupied_co[color]
+            if color == chess.WHITE:
+                attacks = ((pawns << 7) & ~chess.BB_FILE_H | (pawns << 9) & ~chess.BB_FILE_A) & chess.BB_ALL
+            else:
+                attacks = (pawns >> 9) & ~chess.BB_FILE_H | (pawns >> 7) & ~chess.BB_FILE_A
+            self._pawn_attacks[color] = attacks
+        return attacks
+
+    def attacks(self, color):
+        # Union of the squares attacked by all pieces of *color*
+        attacks = self._attacks[color]
+        if attacks is None:
+            board = self.board
+            attacks = self.pawn_attacks(color)
+            for square in chess.scan_forward(board.occupied_co[color] & ~board.pawns):
+                attacks |= board.attacks_mask(square)
+            self._attacks[color] = attacks
+        return attacks
+
+    def is_attacked_by(self, color, square):
+        return bool(self.attacks(color) & chess.BB_SQUARES[square])
+
+    def attacker_counts(self, color):
+        # Number of pieces of *color* attacking each occupied square, 0 on empty squares;
+        # the terms only ask about squares with a piece on them
+        counts = self._attacker_counts[color]
+        if counts is None:
+            board = self.board
+            occupied = board.occupied
+            counts = [0] * 64
+            for square in chess.scan_forward(board.occupied_co[color]):
+                for target in chess.scan_forward(board.attacks_mask(square) & occupied):
+                    counts[target] += 1
+            self._attacker_counts[color] = counts
+        return counts
+
+    def attacker_count(self, color, square):
+        return self.attacker_counts(color)[square]
@@ -0,0 +1,174 @@
+import chess
+import numpy as np
+from data import PIECE_VALUES, PST_MG, PST_EG, PHASE_VALUES, MAX_PHASE, TAPERED_WEIGHTS, WEIGHT_TERMS
+from bitboards import PASSED_PAWN_MASKS
+
+# Piece planes: White pawn..king are planes 0-5, Black pawn..king planes 6-11
+PLANES = 12
+WHITE_PAWN = 0
+WHITE_ROOK = 3
+WHITE_QUEEN = 4
+BLACK_PAWN = 6
+BLACK_ROOK = 9
+BLACK_QUEEN = 10
+
+
+def plane_index(piece_type, color):
+    return piece_type - 1 + (0 if color == chess.WHITE else 6)
+
+
+def square_matrix(masks):
+    # 64x64 matrix of a per-square bitboard table: row = square, column = target square
+    bits = np.array(masks, dtype=np.uint64).view(np.uint8).reshape(64, 8)
+    return np.unpackbits(bits, axis=1, bitorder="little").astype(np.float32)
+
+
+class BatchEvaluator:
+    # Vectorized material, piece-square, pawn and file terms of AdvancedAI for many
+    # positions at once. Boards are encoded into N x 12 x 64 piece planes and every
+    # term is computed with array operations over the whole batch; the results agree
+    # with the scalar term methods of AdvancedAI.
+    def __init__(self, chunk_size=1024):
+        self.chunk_size = chunk_size  # Boards per chunk, bounds the N x 64 x 64 temporaries
+
+        signs = np.array([1.0] * 6 + [-1.0] * 6)
+        piece_types = [piece_type for piece_type in chess.PIECE_TYPES] * 2
+        colors = [chess.WHITE] * 6 + [chess.BLACK] * 6
+        self.material_values = signs * np.array([PIECE_VALUES[piece_type] for piece_type in piece_types])
+        self.phase_values = np.array([PHASE_VALUES[piece_type] for piece_type in piece_types])
+        self.pst_mg = signs[:, None] * np.array([PST_MG[color][piece_type] for piece_type, color in zip(piece_types, colors)])
+        self.pst_eg = signs[:, None] * np.array([PST_EG[color][piece_type] for piece_type, color in zip(piece_types, colors)])
+        self.weights = np.array(TAPERED_WEIGHTS)  # (MAX_PHASE + 1) x len(WEIGHT_TERMS)
+
+        squares = np.arange(64)
+        self.ranks = squares >> 3
+
+        # Leaper attacks, and the lines and in-between squares of the sliding pieces
+        self.knight_attacks = square_matrix(chess.BB_KNIGHT_ATTACKS)
+        self.king_attacks = square_matrix(chess.BB_KING_ATTACKS)
+        self.pawn_attacks = [square_matrix(chess.BB_PAWN_ATTACKS[chess.BLACK]),  # Indexed by color
+                             square_matrix(chess.BB_PAWN_ATTACKS[chess.WHITE])]
+        self.passed_masks = square_matrix(PASSED_PAWN_MASKS)
+        self.orthogonal = np.zeros((64, 64), dtype=bool)
+        self.diagonal = np.zeros((64, 64), dtype=bool)
+        between = np.zeros((64, 64, 64), dtype=np.float32)  # From, to, square in between
+        for a in chess.SQUARES:
+            for b in chess.SQUARES:
+                if a == b or not chess.BB_RAYS[a][b]:
+                    continue
+                if chess.square_file(a) == chess.square_file(b) or chess.square_rank(a) == chess.square_rank(b):
+                    self.orthogonal[a, b] = True
+                else:
+                    self.diagonal[a, b] = True
+                for square in chess.scan_forward(chess.between(a, b)):
+                    between[a, b, square] = 1
+        self.between = between.reshape(64 * 64, 64).T  # Square in between x (from, to) pair
+
+    def encode(self, boards):
+        # Piece planes (N x 12 x 64, uint8) and side to move (N, bool) of *boards*
+        bitboards = np.array(
+            [[board.pieces_mask(piece_type, color) for color in (chess.WHITE, chess.BLACK)
+              for piece_type in chess.PIECE_TYPES] for board in boards],
+            dtype=np.uint64,
+        ).reshape(len(boards), PLANES)
+        bits = bitboards.view(np.uint8).reshape(len(boards), PLANES, 8)
+        planes = np.unpackbits(bits, axis=2, bitorder="little")
+        turns = np.array([board.turn == chess.WHITE for board in boards], dtype=bool)
+        return planes, turns
+
+    def evaluate(self, boards):
+        # Weighted sum of the batch terms, as in AdvancedAI.evaluate
+        scores = []
+        for start in range(0, len(boards), self.chunk_size):
+            planes, turns = self.encode(boards[start:start + self.chunk_size])
+            terms = self.terms(planes, turns)
+            weights = self.weights[terms["phase"]]
+            score = np.zeros(len(planes))
+            for index, term in enumerate(WEIGHT_TERMS):
+                if term in terms:
+                    score += weights[:, index] * terms[term]
+            scores.append(score)
+        return np.concatenate(scores) if scores else np.zeros(0)
+
+    def terms(self, planes, turns):
+        # Unweighted terms by WEIGHT_TERMS name (plus "phase"), one value per board
+        planes = planes.astype(np.float32)
+        counts = planes.sum(axis=2)
+
+        phase = np.minimum(counts @ self.phase_values, MAX_PHASE).astype(int)
+        pst_mg = np.einsum("npq,pq->n", planes, self.pst_mg)
+        pst_eg = np.einsum("npq,pq->n", planes, self.pst_eg)
+
+        white_pawns = planes[:, WHITE_PAWN]
+        black_pawns = planes[:, BLACK_PAWN]
+        attacks = self.attacks(planes)
+
+        return {
+            "phase": phase,
+            "material": counts @ self.material_values,
+            "piece_square": (pst_mg * phase + pst_eg * (MAX_PHASE - phase)) / MAX_PHASE,
+            "pawn_structure": (self.pawn_shape(white_pawns, black_pawns) -
+                               5 * (white_pawns * (1 - attacks[chess.BLACK])).sum(axis=1) +
+                               5 * (black_pawns * (1 - attacks[chess.WHITE])).sum(axis=1)),
+            "passed_pawn": np.where(turns,
+                                    self.passed_pawns(white_pawns, black_pawns, self.ranks),
+                                    self.passed_pawns(black_pawns, white_pawns, 7 - self.ranks)),
+            "pawn_majority": 5 * (white_pawns.sum(axis=1) - black_pawns.sum(axis=1)),
+            "weak_squares": (-10 * self.unsupported_pawns(white_pawns) +
+                             10 * self.unsupported_pawns(black_pawns)),
+            "open_files": (self.file_control(planes[:, WHITE_ROOK] + planes[:, WHITE_QUEEN], white_pawns, 7 - self.ranks) -
+                           self.file_control(planes[:, BLACK_ROOK] + planes[:, BLACK_QUEEN], black_pawns, self.ranks)),
+        }
+
+    def attacks(self, planes):
+        # Squares attacked by each color (N x 64 of 0/1), indexed by color
+        occupied = planes.sum(axis=1)
+        # Lines from square to square that no piece blocks
+        clear = (occupied @ self.between).reshape(-1, 64, 64) == 0
+        attacks = [None, None]
+        for color in chess.COLORS:
+            pawns, knights, bishops, rooks, queens, kings = (
+                planes[:, plane_index(piece_type, color)] for piece_type in chess.PIECE_TYPES)
+            leapers = (pawns @ self.pawn_attacks[color] + knights @ self.knight_attacks +
+                       kings @ self.king_attacks)
+            orthogonal = (rooks + queens).astype(bool)
+            diagonal = (bishops + queens).astype(bool)
+            sliders = clear & ((orthogonal[:, :, None] & self.orthogonal) |
+                               (diagonal[:, :, None] & self.diagonal))
+            attacks[color] = ((leapers > 0) | sliders.any(axis=1)).astype(np.float32)
+        return attacks
+
+    def pawn_shape(self, white_pawns, black_pawns):
+        # Isolated, doubled and backward pawns as in AdvancedAI.pawn_shape_score
+        score = np.zeros(len(white_pawns))
+        for pawns, sign in ((white_pawns, 1), (black_pawns, -1)):
+            file_counts = pawns.reshape(-1, 8, 8).sum(axis=1)  # N x 8 files
+            files = file_counts > 0
+            left = np.zeros_like(files)
+            right = np.zeros_like(files)
+            left[:, 1:] = files[:, :-1]
+            right[:, :-1] = files[:, 1:]
+            isolated = (file_counts * ~(left | right)).sum(axis=1)
+            doubled = (file_counts > 1).sum(axis=1)
+            backward = (file_counts[:, :7] * ~right[:, :7]).sum(axis=1)  # No pawn on the next file towards h
+            score += sign * (5 * isolated - 10 * doubled - 10 * backward)
+        return score
+
+    def passed_pawns(self, pawns, opponent_pawns, rank_scores):
+        # Rank-based score of the pawns without opponent pawns in their PASSED_PAWN_MASKS
+        blockers = opponent_pawns @ self.passed_masks.T
+        return (pawns * (blockers == 0) * rank_scores).sum(axis=1)
+
+    def unsupported_pawns(self, pawns):
+        # Pawns without a friendly pawn on the same rank at most one file away (the pawn included)
+        grid = pawns.reshape(-1, 8, 8) > 0
+        supported = grid.copy()
+        supported[:, :, 1:] |= grid[:, :, :-1]
+        supported[:, :, :-1] |= grid[:, :, 1:]
+        return (grid & ~supported).reshape(-1, 64).sum(axis=1)
+
+    def file_control(self, heavy_pieces, pawns, rank_scores):
+        # Rooks and queens on files without own pawns: 10 plus twice the rank score
+        pawn_files = pawns.reshape(-1, 8, 8).sum(axis=1) > 0
+        open_squares = np.tile(~pawn_files, 8)  # Square index = rank * 8 + file
+        return (heavy_pieces * open_squares * (10 + 2 * rank_scores)).sum(axis=1)
@@ -0,0 +1,61 @@
+"""
+Time-to-depth benchmark of the Lazy SMP search mode.
+
+Searches a few fixed positions to a fixed depth with 1, 2, 4, ... processes
+(up to os.cpu_count()) and prints the time and the speedup over one process.
+
+Usage: python benchmark.py [depth] [max_workers]
+"""
+
+import os
+import sys
+import time
+import chess
+from parallel import LazySMPAdvancedAI
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10",
+    "8/5pk1/6p1/3R4/7P/6P1/r4PK1/8 b - - 0 40",
+]
+
+
+def time_to_depth(workers, depth):
+    ai = LazySMPAdvancedAI(chess.WHITE, "Benchmark", workers)
+    ai.base_max_depth = depth
+    ai.base_max_move_time_cal = 3600  # Only the depth limit ends the search
+    ai.start_pool()  # Starts the helper processes before anything is timed
+
+    total = 0.0
+    for fen in POSITIONS:
+        ai.tt.clear()
+        start = time.time()
+        ai.get_move(chess.Board(fen))
+        total += time.time() - start
+    ai.clear()
+    return total
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+
+    print(f"Time to depth {depth} over {len(POSITIONS)} positions")
+    baseline = None
+    for workers in counts:
+        seconds = time_to_depth(workers, depth)
+        baseline = baseline or seconds
+        print(f"{workers:>3} processes: {seconds:7.2f} s  speedup {baseline / seconds:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import chess
+
+# Precomputed masks for the bitboard evaluation terms
+
+FILES = chess.BB_FILES
+RANKS = chess.BB_RANKS
+
+# Files next to a file (not the file itself)
+ADJACENT_FILES = [
+    (FILES[file - 1] if file > 0 else chess.BB_EMPTY) | (FILES[file + 1] if file < 7 else chess.BB_EMPTY)
+    for file in range(8)
+]
+
+# Ranks strictly above a rank (towards rank 8)
+RANKS_ABOVE = [
+    sum(RANKS[above] for above in range(rank + 1, 8))
+    for rank in range(8)
+]
+
+# Opponent pawns that stop a pawn on a square from counting as passed: same or
+# adjacent files, two or more ranks above it (the rule of is_passed_pawn for both colors)
+PASSED_PAWN_MASKS = [
+    (FILES[square % 8] | ADJACENT_FILES[square % 8]) & (RANKS_ABOVE[square // 8 + 1] if square // 8 < 7 else 0)
+    for square in range(64)
+]
+
+QUEENSIDE = FILES[0] | FILES[1] | FILES[2] | FILES[3]
+KINGSIDE = FILES[4] | FILES[5] | FILES[6] | FILES[7]
+
+
+def file_fill(bb):
+    # Every square on a file that contains at least one bit of *bb*
+    bb |= bb << 8
+    bb |= bb << 16
+    bb |= bb << 32
+    bb &= chess.BB_ALL
+    bb |= bb >> 8
+    bb |= bb >> 16
+    bb |= bb >> 32
+    return bb
+
+
+def shift_east(bb):
+    return (bb << 1) & ~chess.BB_FILE_A & chess.BB_ALL
+
+
+def shift_west(bb):
+    return (bb >> 1) & ~chess.BB_FILE_H
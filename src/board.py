@@ -16,15 +16,35 @@ class Board:
         self.facing_color = facing_color
         self.font = pygame.font.SysFont('Arial', 12)
 
+        # Cached layers: the checkerboard per orientation, and the board with its pieces,
+        # recomposed only when the position, orientation or highlighted squares change
+        layer_size = self.square_size * self.rows
+        self.rect = pygame.Rect(offset, (layer_size, layer_size))
+        self.square_layers = {}
+        self.piece_layer = pygame.Surface(self.rect.size)
+        self.layer_key = None
+
+        # Game status of the displayed position, only computed again after a push
+        self.outcome = None
+        self.outcome_known = False
+
     def move(self, move):
         if move in self.board.legal_moves:
             self.current_move = move
 
     def update_board_state_after_animation(self):
         self.board.push(self.current_move)
+        self.outcome_known = False
+
+    def game_outcome(self):
+        # chess.Outcome of the position, None while the game goes on
+        if not self.outcome_known:
+            self.outcome = self.board.outcome()
+            self.outcome_known = True
+        return self.outcome
 
     def is_game_over(self):
-        return self.board.is_game_over()
+        return self.game_outcome() is not None
         
     def get_square_index(self, square):
         row = 7 - (square // 8) if self.facing_color != chess.BLACK else (square // 8)
@@ -45,36 +65,56 @@ class Board:
         return None
 
     def render(self, screen, movesquare, selected_square=None):
-        for square in chess.SQUARES:
-            self.render_square(screen, square)
-            if movesquare != square:
-                piece = self.board.piece_at(square)
-                if piece:
-                    piece_image = self.piece_images[piece.symbol()]
-                    piece_position = self.get_square_position(square)
-                    
-                    screen.blit(piece_image, piece_position)
-                    # Debug text piece infor
-                    # text_surface = self.font.render(piece.symbol(), True, (0, 0, 0))
-                    # screen.blit(text_surface, piece_position)
+        self.update_layer(movesquare, selected_square)
+        screen.blit(self.piece_layer, self.offset)
+
+    def update_layer(self, movesquare, selected_square=None):
+        # Recomposes the piece layer if anything on it changed; returns whether it did
+        key = (self.board.board_fen(), self.facing_color, movesquare, selected_square)
+        if key == self.layer_key:
+            return False
+        self.layer_key = key
+
+        self.piece_layer.blit(self.square_layer(), (0, 0))
+        for square, piece in self.board.piece_map().items():
+            if square != movesquare:
+                piece_image = self.piece_images[piece.symbol()]
+                self.piece_layer.blit(piece_image, self.get_layer_position(square))
+                # Debug text piece infor
+                # text_surface = self.font.render(piece.symbol(), True, (0, 0, 0))
+                # self.piece_layer.blit(text_surface, self.get_layer_position(square))
 
         if selected_square is not None:
-            (row, col) = self.get_square_index(selected_square)
-            rect = pygame.Rect(
-                col * self.square_size + self.offset[0], row * self.square_size + self.offset[1],
-                self.square_size, self.square_size
-            )
-            pygame.draw.rect(screen, (255, 0, 0), rect, 3)  # Draw a red outline
-                    
-    def render_square(self, screen, square):
+            rect = pygame.Rect(self.get_layer_position(selected_square), (self.square_size, self.square_size))
+            pygame.draw.rect(self.piece_layer, (255, 0, 0), rect, 3)  # Draw a red outline
+        return True
+
+    def square_layer(self):
+        # The checkerboard only depends on the orientation, so it is drawn once per orientation
+        layer = self.square_layers.get(self.facing_color)
+        if layer is None:
+            layer = pygame.Surface(self.rect.size)
+            for square in chess.SQUARES:
+                self.render_square(layer, square)
+            self.square_layers[self.facing_color] = layer
+        return layer
+
+    def restore(self, screen, rect):
+        # Redraws the board under *rect* (screen coordinates) from the cached layer
+        clipped = rect.clip(self.rect)
+        screen.blit(self.piece_layer, clipped, clipped.move(-self.offset[0], -self.offset[1]))
+
+    def get_layer_position(self, square):
+        (row, col) = self.get_square_index(square)
+        return (col * self.square_size, row * self.square_size)
+
+    def render_square(self, layer, square):
         (row, col) = self.get_square_index(square)
         color = self.colors[(row + col) % 2]
 
-        rect = pygame.Rect(
-            col * self.square_size + self.offset[0], row * self.square_size + self.offset[1], self.square_size, self.square_size
-        )
+        rect = pygame.Rect(self.get_layer_position(square), (self.square_size, self.square_size))
 
-        pygame.draw.rect(screen, color, rect)
+        pygame.draw.rect(layer, color, rect)
 
         # Debug text square infor
         # text_surface = self.font.render(chess.square_name(square), True, (0, 0, 0))
@@ -82,5 +122,5 @@ class Board:
 
         # text_rect = text_surface.get_rect(bottomleft=rect.bottomleft)
         # text_rect_index = text_surface_index.get_rect(bottomright=rect.bottomright)
-        # screen.blit(text_surface, text_rect)
-        # screen.blit(text_surface_index, text_rect_index)
\ No newline at end of file
+        # layer.blit(text_surface, text_rect)
+        # layer.blit(text_surface_index, text_rect_index)
\ No newline at end of file
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+# Rough per-entry cost of a cached position: OrderedDict node, 64-bit int key and a float value
+DEFAULT_ENTRY_BYTES = 160
+MB = 1024 * 1024
+
+class LRUCache:
+    def __init__(self, budget_mb=16, entry_bytes=DEFAULT_ENTRY_BYTES):
+        self.budget_mb = budget_mb
+        self.entry_bytes = entry_bytes
+        self.capacity = max(1, int(budget_mb * MB) // entry_bytes)
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.capacity:
+            entries.popitem(last=False)  # Drop the least recently used entry
+            self.evictions += 1
+        entries[key] = value
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    @property
+    def resident_bytes(self):
+        return len(self.entries) * self.entry_bytes
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "resident_mb": self.resident_bytes / MB,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
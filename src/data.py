@@ -22,18 +22,6 @@ class GameResource:
         
         return images
 
-# Rook directions
-ROOK_DIRECTIONS = [-8, 8, -1, 1]
-
-# Bishop directions (diagonals)
-BISHOP_DIRECTIONS = [-9, 9, -7, 7]
-
-# Knight moves (in 'L' shape)
-KNIGHT_MOVES = [-17, -15, -10, -6, 6, 10, 15, 17]
-
-# King moves (one square in any direction)
-KING_MOVES = [-9, -8, -7, -1, 1, 7, 8, 9]
-
 PIECE_VALUES = {
     chess.PAWN: 1,
     chess.KNIGHT: 3,
@@ -112,6 +100,102 @@ PIECE_SQUARE_TABLES = {
     ]
 }
 
+# Endgame tables: pawns gain value as they advance and the king belongs in the center,
+# the other pieces keep their middlegame tables
+ENDGAME_PIECE_SQUARE_TABLES = dict(PIECE_SQUARE_TABLES)
+ENDGAME_PIECE_SQUARE_TABLES[chess.PAWN] = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [80, 80, 80, 80, 80, 80, 80, 80],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [30, 30, 30, 30, 30, 30, 30, 30],
+    [20, 20, 20, 20, 20, 20, 20, 20],
+    [10, 10, 10, 10, 10, 10, 10, 10],
+    [10, 10, 10, 10, 10, 10, 10, 10],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+ENDGAME_PIECE_SQUARE_TABLES[chess.KING] = [
+    [-50, -40, -30, -20, -20, -30, -40, -50],
+    [-30, -20, -10, 0, 0, -10, -20, -30],
+    [-30, -10, 20, 30, 30, 20, -10, -30],
+    [-30, -10, 30, 40, 40, 30, -10, -30],
+    [-30, -10, 30, 40, 40, 30, -10, -30],
+    [-30, -10, 20, 30, 30, 20, -10, -30],
+    [-30, -30, 0, 0, 0, 0, -30, -30],
+    [-50, -30, -30, -30, -30, -30, -30, -50],
+]
+
+def flatten_piece_square_tables(tables):
+    # flat[color][piece_type][square] -> value, precomputed once at import.
+    # The tables above are written from White's side with rank 8 on the first row,
+    # Black uses the same table mirrored vertically.
+    flat = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+    for piece_type, table in tables.items():
+        for square in range(64):
+            rank, file = square // 8, square % 8
+            flat[chess.WHITE][piece_type][square] = table[7 - rank][file]
+            flat[chess.BLACK][piece_type][square] = table[rank][file]
+    return flat
+
+PST_MG = flatten_piece_square_tables(PIECE_SQUARE_TABLES)
+PST_EG = flatten_piece_square_tables(ENDGAME_PIECE_SQUARE_TABLES)
+
+# Evaluation weights of AdvancedAI for the middlegame and the endgame.
+# piece_square is kept up to date by the SearchState but not scored yet: at 0.05 it
+# lost a depth-3 self-play match against 0 (22.5/54), so it needs its own tuning
+MIDDLEGAME_WEIGHTS = {
+    "material": 1.5,
+    "piece_square": 0.0,
+    "pawn_structure": 0.8,
+    "king_safety": 1.0,
+    "center_control": 0.8,
+    "rook_activity": 0.5,
+    "passed_pawn": 0.8,
+    "bishop_pair": 0.6,
+    "knight_outposts": 0.7,
+    "open_files": 0.4,
+    "weak_squares": 0.5,
+    "pawn_majority": 0.6,
+    "piece_mobility": 0.6,
+    "tempo": 0.4,
+    "hanging_pieces": 1.2,
+    "piece_coordination": 0.6,
+}
+
+ENDGAME_WEIGHTS = {
+    "material": 1.5,
+    "piece_square": 0.0,
+    "pawn_structure": 0.5,
+    "king_safety": 1.0,
+    "center_control": 0.3,
+    "rook_activity": 0.7,
+    "passed_pawn": 1.2,
+    "bishop_pair": 0.5,
+    "knight_outposts": 0.7,
+    "open_files": 0.4,
+    "weak_squares": 0.5,
+    "pawn_majority": 0.8,
+    "piece_mobility": 0.2,
+    "tempo": 0.3,
+    "hanging_pieces": 1.2,
+    "piece_coordination": 0.6,
+}
+
+# Order of the terms in the weight vectors below
+WEIGHT_TERMS = tuple(MIDDLEGAME_WEIGHTS)
+
+# Game phase: 24 with all minor and major pieces on the board, 0 with none left
+PHASE_VALUES = [0, 0, 1, 1, 2, 4, 0]  # Indexed by piece type
+MAX_PHASE = 24
+
+# Weight vectors blended by phase (tapered evaluation), preallocated for every phase value
+TAPERED_WEIGHTS = [
+    tuple(
+        (MIDDLEGAME_WEIGHTS[term] * phase + ENDGAME_WEIGHTS[term] * (MAX_PHASE - phase)) / MAX_PHASE
+        for term in WEIGHT_TERMS
+    )
+    for phase in range(MAX_PHASE + 1)
+]
+
 OPENING_BOOK = {
     "startpos": [
         chess.Move.from_uci("e2e4"),  # King's Pawn Opening: 1. e4
@@ -2,6 +2,8 @@ import sys
 import pygame
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from data import *
 from board import *
 from pygame.locals import *
@@ -9,6 +11,14 @@ from player import *
 from ui import *
 
 TITLE = 'Chess'
+AI_DONE_EVENT = pygame.USEREVENT + 1  # Posted by the worker threads when a search finishes
+
+def post_ai_done(future):
+    # Wakes the game loop from its event wait; runs on the worker thread
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(AI_DONE_EVENT))
+
+
 class Game:
     def __init__(self):
         #window config
@@ -43,13 +53,27 @@ class Game:
         self.facing_color = chess.WHITE
 
         #time
-        fps = 60
-        self.target_update_time = 1/fps
-        self.render_rate = 60
-        self.render_clock = pygame.time.Clock()
-        self.last_update_time = time.time()
+        self.frame_time = 1/60  # Only used while a piece is animated
+        self.last_frame_time = 0
+        self.shown_screen = None  # Menu or pick screen currently on the display
+
+        #the loop sleeps until an event arrives; nothing reacts to mouse motion
+        pygame.event.set_blocked(MOUSEMOTION)
+
+        #AI moves are searched on a worker thread, so the loop keeps rendering and handling input
+        self.ai_executor = ThreadPoolExecutor(max_workers=1)
+        self.ai_future = None
+        self.ai_stop = None  # Stop flag of the submitted search, one per search
+
+        #pondering AIs search on the opponent's time on a thread of their own
+        self.ponder_executor = ThreadPoolExecutor(max_workers=1)
+        self.ponder_future = None
+        self.ponder_player = None
+        self.ponder_stop = None
 
     def match_init(self):
+        self.cancel_ai_move()
+
         #board initialize
         resource = GameResource()
         self.board = Board(self.BOARD_WIDTH, self.facing_color, resource, self.BOARD_OFFSET)
@@ -70,22 +94,50 @@ class Game:
         self.last_move_time = time.time()
         self.on_move_square = None
 
+        #dirty-rect rendering: the whole window is only redrawn when the UI changes
+        self.full_redraw = True
+        self.ui_state = None
+        self.animation_rect = None  # Where the animated piece was drawn last
+
     def run(self):
         while self.running:
-            self.handle_input()
-            current_time = time.time()
-            elapsed_time = current_time - self.last_update_time
-
-            if elapsed_time >= self.target_update_time:
-                self.update(elapsed_time)
-                self.last_update_time = current_time
-
+            self.handle_input(self.wait_events())
+            if not self.running:
+                break
+            self.update()
             self.render()
-            self.render_clock.tick(self.render_rate)
         pygame.quit()
         self.clear()
 
-    def update(self, delta_time):
+    def wait_events(self):
+        # Sleeps until an event arrives or the next scheduled wakeup is due
+        timeout = self.next_wakeup()
+        if timeout is None:
+            events = [pygame.event.wait()]
+        elif timeout > 0:
+            event = pygame.event.wait(max(int(timeout * 1000), 1))
+            events = [event] if event.type != NOEVENT else []
+        else:
+            events = []
+        return events + pygame.event.get()
+
+    def next_wakeup(self):
+        # Seconds until the loop has work without any new event, None when only an
+        # event (input, or AI_DONE_EVENT from a finished search) can change anything
+        if self.menu.in_menu or self.pick_level.in_pick:
+            return None
+        if self.is_animating:
+            return self.last_frame_time + self.frame_time - time.time()
+        if self.pausing or self.board.is_game_over():
+            return None
+        if isinstance(self.players[self.turn], HumanPlayer) or self.ai_future is not None:
+            return None
+        if (self.ponder_future is not None and not self.ponder_future.done()
+                and self.ponder_stop.is_set()):
+            return None  # Stopped by handle_players_turn, woken when it returns
+        return self.last_move_time + self.move_delay - time.time()
+
+    def update(self):
         if self.menu.in_menu or self.pick_level.in_pick or self.pausing:
             return
         if not self.running or self.board.is_game_over():
@@ -97,34 +149,62 @@ class Game:
         self.handle_players_turn()
 
     def render(self):
-        if self.menu.in_menu:
-            self.menu.render()
-            return
-        if self.pick_level.in_pick:
-            self.pick_level.render()
+        # The menus are static, they are only drawn when they are opened
+        if self.menu.in_menu or self.pick_level.in_pick:
+            shown_screen = self.menu if self.menu.in_menu else self.pick_level
+            if shown_screen is not self.shown_screen:
+                self.shown_screen = shown_screen
+                shown_screen.render()
+                pygame.display.flip()
+            self.full_redraw = True
             return
+        self.shown_screen = None
+
+        # A finished animation hands its piece to the board before anything is drawn,
+        # the loop may sleep until the next input right after this frame
+        if self.is_animating and time.time() - self.animation_start_time >= self.animation_duration:
+            self.board.update_board_state_after_animation()
+            self.is_animating = False
 
-        self.screen.fill(BACKGROUND_COLOR)
-        
         selected_square = None
         if isinstance(self.players[self.turn], HumanPlayer):
             selected_square = self.players[self.turn].selected_square
 
-        self.board.render(self.screen, self.on_move_square, selected_square=selected_square)
-        self.in_game_ui.render()
+        # Only the parts of the window that changed are drawn and sent to the display
+        dirty_rects = []
+        board_changed = self.board.update_layer(self.on_move_square, selected_square)
+        game_over = self.board.is_game_over()
+        ui_state = (self.turn, self.pausing, game_over)
+        # The game-over message is drawn over the board, so a board change redraws it too
+        if self.full_redraw or ui_state != self.ui_state or (board_changed and game_over):
+            self.full_redraw = False
+            self.ui_state = ui_state
+            self.screen.fill(BACKGROUND_COLOR)
+            self.board.render(self.screen, self.on_move_square, selected_square)
+            self.in_game_ui.render()
+            self.animation_rect = None
+            dirty_rects.append(self.screen.get_rect())
+        elif board_changed:
+            self.board.render(self.screen, self.on_move_square, selected_square)
+            self.animation_rect = None
+            dirty_rects.append(self.board.rect)
 
         if self.is_animating:
-            self.render_animation()
+            self.last_frame_time = time.time()
+            dirty_rects.extend(self.render_animation())
 
-        pygame.display.flip()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
 
     #handle input
-    def handle_input(self):
-        events = pygame.event.get()
+    def handle_input(self, events):
         for event in events:
             key_pressed = pygame.key.get_pressed()
             if event.type == QUIT:
                 self.quit()
+            elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                self.shown_screen = None
+                self.full_redraw = True
             elif key_pressed[K_ESCAPE]:
                 self.return_menu()
 
@@ -138,17 +218,23 @@ class Game:
                 self.players[self.turn].handle_events(events, self.board, self.board.board)
 
     def return_menu(self):
+        self.cancel_ai_move()
         self.menu.in_menu = True
         self.pick_level.in_pick = True
 
     def quit(self):
         self.running = False  # Stop the game loop
+        self.cancel_ai_move()
+        self.ai_executor.shutdown(wait=False, cancel_futures=True)
+        self.ponder_executor.shutdown(wait=False, cancel_futures=True)
         for player in self.players:
             if player:
                 player.clear()
 
     def pause(self):
         self.pausing = not self.pausing
+        if self.pausing:
+            self.cancel_ai_move()  # Searched again from scratch when the game resumes
     
     def reset(self):
         self.shuffle_players(self.players)
@@ -195,27 +281,75 @@ class Game:
                 self.board.move(move)
                 self.start_animation(move)
                 self.change_turn()
-        else:
+        elif self.ai_future is None:
             current_time = time.time()
             if current_time - self.last_move_time >= self.move_delay:
-                move = current_player.get_move(self.board.board)
-                self.start_animation(move)
-                self.board.move(move)
-                self.last_move_time = current_time
-                self.change_turn()
+                # Pondering only uses the opponent's idle time: stop it before any search,
+                # and let the AI's own ponder search finish before it moves
+                if self.ponder_future is not None:
+                    self.stop_ponder()
+                    if self.ponder_player is current_player and not self.ponder_future.done():
+                        return
+                    if self.ponder_future.done():
+                        self.ponder_future = None
+                        self.ponder_player = None
+
+                # The search works on a copy, the displayed board is never touched by it
+                self.ai_stop = threading.Event()
+                self.ai_future = self.ai_executor.submit(current_player.get_move_until,
+                                                         self.board.board.copy(), self.ai_stop)
+                self.ai_future.add_done_callback(post_ai_done)
+        elif self.ai_future.done():
+            move = self.ai_future.result()
+            self.ai_future = None
+            self.ai_stop = None
+            self.start_animation(move)
+            self.board.move(move)
+            self.last_move_time = time.time()
+            if current_player.pondering:
+                self.start_ponder(current_player, move)
+            self.change_turn()
+
+    def start_ponder(self, player, move):
+        # The displayed board only receives *move* once its animation ends
+        board = self.board.board.copy()
+        board.push(move)
+        if board.is_game_over():
+            return
+        self.ponder_player = player
+        self.ponder_stop = threading.Event()
+        self.ponder_future = self.ponder_executor.submit(player.ponder, board, self.ponder_stop)
+        self.ponder_future.add_done_callback(post_ai_done)
+
+    def stop_ponder(self):
+        # The ponder search returns at its next time check
+        if self.ponder_stop is not None:
+            self.ponder_stop.set()
+
+    def cancel_ai_move(self):
+        # Drop the pending AI move; a search that already started (or starts before
+        # the cancel lands) sees its stop flag and its result is ignored
+        self.stop_ponder()
+        if self.ai_future is not None:
+            self.ai_future.cancel()
+            self.ai_stop.set()
+            self.ai_future = None
+            self.ai_stop = None
 
     def render_animation(self):
+        # Moves the animated piece over the cached board layer and returns the changed areas
         elapsed_time = time.time() - self.animation_start_time
         t = min(elapsed_time / self.animation_duration, 1.0)
         current_x = self.start_pos[0] + t * (self.end_pos[0] - self.start_pos[0])
         current_y = self.start_pos[1] + t * (self.end_pos[1] - self.start_pos[1])
 
-        self.board.render(self.screen, self.on_move_square)
-        self.screen.blit(self.piece_image, (current_x, current_y))
-
-        if t >= 1.0:
-            self.board.update_board_state_after_animation()
-            self.is_animating = False
+        dirty_rects = []
+        if self.animation_rect is not None:
+            self.board.restore(self.screen, self.animation_rect)
+            dirty_rects.append(self.animation_rect)
+        self.animation_rect = self.screen.blit(self.piece_image, (current_x, current_y))
+        dirty_rects.append(self.animation_rect)
+        return dirty_rects
 
     def start_animation(self, move):
         self.is_animating = True
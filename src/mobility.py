@@ -0,0 +1,58 @@
+import chess
+
+# Precomputed attack tables indexed by square; off-board targets never appear in them,
+# so nothing can wrap around from one edge of the board to the other
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+
+MOBILITY_PIECE_TYPES = (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING)
+
+
+def rook_attacks(square, occupied):
+    # Sliding attacks looked up by the occupancy of the rank and file through the square
+    return (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] |
+            chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+
+
+def bishop_attacks(square, occupied):
+    return chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+
+
+def piece_attacks(piece_type, square, occupied):
+    if piece_type == chess.KNIGHT:
+        return KNIGHT_ATTACKS[square]
+    if piece_type == chess.BISHOP:
+        return bishop_attacks(square, occupied)
+    if piece_type == chess.ROOK:
+        return rook_attacks(square, occupied)
+    if piece_type == chess.QUEEN:
+        return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
+    if piece_type == chess.KING:
+        return KING_ATTACKS[square]
+    return 0
+
+
+def pawn_pushes(pawns, color, occupied):
+    # Single and double pushes of *pawns* onto empty squares
+    empty = ~occupied & chess.BB_ALL
+    if color == chess.WHITE:
+        single = (pawns << 8) & empty
+        double = (single << 8) & empty & chess.BB_RANK_4
+    else:
+        single = (pawns >> 8) & empty
+        double = (single >> 8) & empty & chess.BB_RANK_5
+    return chess.popcount(single) + chess.popcount(double)
+
+
+def mobility(board: chess.Board, color, enemy_pawn_attacks):
+    # Number of safe target squares of all pieces of *color*: squares not held by own
+    # pieces and not attacked by enemy pawns. Pawns count their pushes.
+    occupied = board.occupied
+    own = board.occupied_co[color]
+    safe = ~own & ~enemy_pawn_attacks & chess.BB_ALL
+
+    count = pawn_pushes(board.pawns & own, color, occupied)
+    for piece_type in MOBILITY_PIECE_TYPES:
+        for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+            count += chess.popcount(piece_attacks(piece_type, square, occupied) & safe)
+    return count
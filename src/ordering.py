@@ -0,0 +1,101 @@
+import chess
+
+# Piece values used only for ordering (index = piece type), the king is a cheap attacker
+ORDERING_VALUES = [0, 1, 3, 3, 5, 9, 10]
+MAX_PLY = 64
+
+
+def mvv_lva(board, move):
+    # Most valuable victim first, then least valuable attacker
+    victim = board.piece_type_at(move.to_square) or 0
+    if not victim and board.is_en_passant(move):
+        victim = chess.PAWN
+    attacker = board.piece_type_at(move.from_square)
+    score = ORDERING_VALUES[victim] * 16 - ORDERING_VALUES[attacker]
+    if move.promotion:
+        score += ORDERING_VALUES[move.promotion] * 16
+    return score
+
+
+def tactical_moves(board, exclude=None):
+    # Legal captures and promotions, best MVV-LVA first
+    us = board.turn
+    moves = [move for move in board.generate_legal_captures() if move != exclude]
+    promotion_rank = chess.BB_RANK_7 if us == chess.WHITE else chess.BB_RANK_2
+    promoting_pawns = board.pawns & board.occupied_co[us] & promotion_rank
+    if promoting_pawns:
+        moves.extend(move for move in board.generate_legal_moves(promoting_pawns, ~board.occupied)
+                     if move != exclude)
+    moves.sort(key=lambda move: mvv_lva(board, move), reverse=True)
+    return moves
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # history[color][from_square][to_square]
+        self.history = [[[0] * 64 for _ in range(64)] for _ in range(2)]
+        # countermoves[previous_from][previous_to]
+        self.countermoves = [[None] * 64 for _ in range(64)]
+
+    def new_search(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # Keep some history between moves, but let newer searches dominate
+        for color_table in self.history:
+            for row in color_table:
+                for to_square in range(64):
+                    row[to_square] >>= 1
+
+    def ordered_moves(self, board, ply, tt_move=None):
+        # Staged generator: later (more expensive) stages are only generated
+        # when the earlier moves did not produce a cut-off.
+        us = board.turn
+
+        # Stage 1: move from the transposition table / principal variation
+        if tt_move is not None and board.is_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+
+        # Stage 2: captures (MVV-LVA) and promotions
+        yield from tactical_moves(board, tt_move)
+
+        # Stage 3: killers and the countermove to the previous move
+        quiets = [
+            move for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied_co[not us])
+            if not move.promotion and move != tt_move and not board.is_en_passant(move)
+        ]
+        special = []
+        if ply < MAX_PLY:
+            special.extend(killer for killer in self.killers[ply] if killer is not None)
+        if board.move_stack:
+            previous = board.move_stack[-1]
+            countermove = self.countermoves[previous.from_square][previous.to_square]
+            if countermove is not None:
+                special.append(countermove)
+        for move in special:
+            if move in quiets:
+                quiets.remove(move)
+                yield move
+
+        # Stage 4: remaining quiet moves by history score
+        history = self.history[us]
+        quiets.sort(key=lambda move: history[move.from_square][move.to_square], reverse=True)
+        yield from quiets
+
+    def record_cutoff(self, board, move, ply, depth):
+        # Only quiet moves are remembered, captures are already ordered first
+        if board.is_capture(move) or move.promotion:
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        self.history[board.turn][move.from_square][move.to_square] += depth * depth
+
+        if board.move_stack:
+            previous = board.move_stack[-1]
+            self.countermoves[previous.from_square][previous.to_square] = move
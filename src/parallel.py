@@ -0,0 +1,257 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+import chess
+from player import AdvancedAI
+from state import SearchState
+from timing import SearchTimeout
+from transposition import TranspositionTable, SharedTranspositionTable
+
+HELPER_CHECK_INTERVAL = 64  # Nodes between stop flag polls, keeps the helpers' stop latency low
+HELPER_STOP_WAIT = 0.05  # Seconds a move waits for the helpers to stop before returning
+
+# Per-process state of the pool workers, set up once by init_worker
+worker_ai = None
+worker_root = None  # Root position (FEN and moves) the worker's tables were last aged for
+shared_alpha = None  # Best root score found so far in this iteration, from the root mover's side
+worker_ready = None  # Barrier of the pool's warm-up tasks
+
+
+def init_worker(ready, alpha, eval_cache_mb, tt_mb, pawn_cache_mb):
+    # Every worker keeps one AdvancedAI for its lifetime, so its TT stays warm across
+    # iterations and moves. Nothing here needs a display.
+    global worker_ai, shared_alpha, worker_ready
+    worker_ai = AdvancedAI(chess.WHITE, "Worker", eval_cache_mb, tt_mb, pawn_cache_mb)
+    shared_alpha = alpha
+    worker_ready = ready
+
+
+def warm_up():
+    # Only returns once every worker of the pool runs it at the same time, so all of
+    # them have been started and initialized
+    worker_ready.wait(timeout=60)
+
+
+def start_workers(executor, workers):
+    # Process start-up and module imports happen here, not inside a move's time budget
+    wait([executor.submit(warm_up) for _ in range(workers)])
+
+
+def game_history(board):
+    # FEN of the position after the last capture or pawn move and the UCI moves played
+    # since: enough to rebuild the repetition history and the 50-move counter
+    board = board.copy()
+    moves = []
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        moves.append(board.pop().uci())
+    moves.reverse()
+    return board.fen(), moves
+
+
+def history_board(fen, moves):
+    board = chess.Board(fen)
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+def init_helper(ready, tt_name, stop_flag, eval_cache_mb, tt_mb, pawn_cache_mb):
+    # Lazy SMP helpers search with their own AdvancedAI, but on the shared TT
+    global worker_ai, worker_ready
+    worker_ai = AdvancedAI(chess.WHITE, "Helper", eval_cache_mb, 0, pawn_cache_mb)
+    worker_ai.tt = SharedTranspositionTable(tt_mb, name=tt_name)
+    worker_ai.timer.stop_flag = stop_flag
+    worker_ai.timer.check_mask = HELPER_CHECK_INTERVAL - 1
+    worker_ready = ready
+
+
+def helper_search(fen, moves, helper_index, hard_limit):
+    # Runs the normal iterative deepening on the position after *moves* from *fen*
+    # until the main searcher raises the stop flag. Every other helper starts one ply
+    # deeper, so the helpers do not all search the same tree in lockstep.
+    ai = worker_ai
+    ai.start_depth = 1 + helper_index % 2
+    ai.base_max_move_time_cal = hard_limit
+    ai.get_move(history_board(fen, moves))
+    return ai.timer.nodes
+
+
+def search_root_move(fen, moves, uci, depth, deadline):
+    # Searches one root move of the position after *moves* from *fen* to *depth*
+    # against the shared alpha bound. Returns (uci, value, exact); value is None when
+    # the deadline was hit and exact is False when the move failed low (its value is
+    # only an upper bound).
+    global worker_root
+    ai = worker_ai
+    board = history_board(fen, moves)
+    move = chess.Move.from_uci(uci)
+    maximizing_player = board.turn == chess.WHITE
+
+    root = (fen, tuple(moves))
+    if root != worker_root:
+        worker_root = root
+        ai.tt.new_search()
+        ai.orderer.new_search()
+    ai.state = SearchState(board)
+    ai.timer.hard_limit = deadline - time.time()
+    ai.timer.start()
+
+    # The bound is refreshed from the other workers at the start of every task
+    bound = shared_alpha.value
+    if maximizing_player:
+        alpha, beta = bound, float('inf')
+    else:
+        alpha, beta = float('-inf'), -bound
+
+    ai.state.push(board, move)
+    try:
+        value = ai.alpha_beta(board, depth, alpha, beta, not maximizing_player)
+    except SearchTimeout:
+        return uci, None, False
+
+    root_value = value if maximizing_player else -value
+    if root_value <= bound:
+        return uci, value, False
+    with shared_alpha.get_lock():
+        if root_value > shared_alpha.value:
+            shared_alpha.value = root_value
+    return uci, value, True
+
+
+class ParallelAdvancedAI(AdvancedAI):
+    # AdvancedAI with the root move list split across a process pool. Every iteration
+    # of the iterative deepening submits one task per root move (FEN plus move) and
+    # the workers share the best root score as their alpha bound.
+    def __init__(self, color, name, workers=None, eval_cache_mb=16, tt_mb=32, pawn_cache_mb=2):
+        super().__init__(color, name, eval_cache_mb, tt_mb, pawn_cache_mb)
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_cache_mb = (eval_cache_mb, tt_mb, pawn_cache_mb)
+        self.executor = None
+        self.shared_alpha = None
+
+    def start_pool(self):
+        # Spawned rather than forked, so workers never inherit the parent's pygame/SDL state
+        context = multiprocessing.get_context("spawn")
+        self.shared_alpha = context.Value('d', float('-inf'))
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=init_worker,
+            initargs=(context.Barrier(self.workers), self.shared_alpha, *self.worker_cache_mb),
+        )
+        start_workers(self.executor, self.workers)
+
+    def get_move(self, board):
+        moves = list(board.legal_moves)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        if self.executor is None:
+            self.start_pool()
+
+        self.timer.hard_limit = self.base_max_move_time_cal
+        self.timer.start()
+        deadline = self.timer.start_time + self.timer.hard_limit
+        fen, history = game_history(board)
+
+        best_move = None
+        for depth in range(1, self.base_max_depth + 1):
+            if depth > 1 and self.timer.soft_exceeded():
+                break
+
+            # Previous best move first, so it sets the shared bound early
+            if best_move is not None:
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+
+            with self.shared_alpha.get_lock():
+                self.shared_alpha.value = float('-inf')
+            futures = [self.executor.submit(search_root_move, fen, history, move.uci(), depth, deadline)
+                       for move in moves]
+            done, not_done = wait(futures, timeout=max(deadline - time.time(), 0))
+            for future in not_done:
+                future.cancel()  # Tasks already running stop at the deadline by themselves
+
+            results = [future.result() for future in done if not future.cancelled()]
+            exact = [(uci, value) for uci, value, is_exact in results if is_exact]
+            if not exact:
+                break
+            maximizing_player = board.turn == chess.WHITE
+            uci, value = max(exact, key=lambda result: result[1] if maximizing_player else -result[1])
+
+            # An unfinished iteration only counts if the previous best move was searched in it
+            searched = {move_uci for move_uci, move_value, _ in results if move_value is not None}
+            completed = len(searched) == len(moves)
+            if completed or best_move is None or best_move.uci() in searched:
+                best_move = chess.Move.from_uci(uci)
+            if not completed:
+                break
+
+        return best_move or moves[0]
+
+    def clear(self):
+        super().clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class LazySMPAdvancedAI(AdvancedAI):
+    # AdvancedAI searching the same position in several processes at once (Lazy SMP).
+    # The main searcher runs in this process; workers - 1 helper processes run the same
+    # iterative deepening on a transposition table in shared memory, and the entries
+    # they store make the main search cut off earlier. The helpers' moves are ignored.
+    def __init__(self, color, name, workers=None, eval_cache_mb=16, tt_mb=32, pawn_cache_mb=2):
+        super().__init__(color, name, eval_cache_mb, tt_mb, pawn_cache_mb)
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_cache_mb = (eval_cache_mb, tt_mb, pawn_cache_mb)
+        self.executor = None
+        self.stop_flag = None
+        self.helpers = []  # Helper tasks of the last move, possibly still stopping
+
+    def start_pool(self):
+        eval_cache_mb, tt_mb, pawn_cache_mb = self.worker_cache_mb
+        self.tt = SharedTranspositionTable(tt_mb)
+        if self.workers > 1:
+            context = multiprocessing.get_context("spawn")
+            self.stop_flag = context.Event()
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers - 1, mp_context=context,
+                initializer=init_helper,
+                initargs=(context.Barrier(self.workers - 1), self.tt.name, self.stop_flag, *self.worker_cache_mb),
+            )
+            start_workers(self.executor, self.workers - 1)
+
+    def get_move(self, board):
+        if not isinstance(self.tt, SharedTranspositionTable):
+            self.start_pool()
+
+        # Helpers of the previous move saw the stop flag long ago; they must be gone
+        # before it is cleared again
+        wait(self.helpers)
+
+        # One generation per move, shared with the helpers through the table
+        self.tt.advance_generation()
+        self.helpers = []
+        if self.executor is not None:
+            self.stop_flag.clear()
+            fen, history = game_history(board)
+            self.helpers = [self.executor.submit(helper_search, fen, history, index, self.base_max_move_time_cal)
+                            for index in range(self.workers - 1)]
+
+        move = super().get_move(board)
+
+        if self.helpers:
+            self.stop_flag.set()
+            wait(self.helpers, timeout=HELPER_STOP_WAIT)
+        return move
+
+    def clear(self):
+        if self.executor is not None:
+            self.stop_flag.set()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self.helpers = []
+        if isinstance(self.tt, SharedTranspositionTable):
+            self.tt.close()
+            self.tt = TranspositionTable(self.worker_cache_mb[1])
+        super().clear()
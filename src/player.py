@@ -1,8 +1,16 @@
 import random
-import time
 import chess
 import pygame
 from data import *
+import zobrist
+from state import SearchState, move_counts
+from cache import LRUCache
+from ordering import MoveOrderer, tactical_moves
+from attacks import see, SEE_VALUES, AttackMap
+from timing import TimeManager, SearchTimeout
+from mobility import mobility
+from bitboards import FILES, PASSED_PAWN_MASKS, QUEENSIDE, KINGSIDE, file_fill, shift_east, shift_west
+from transposition import TranspositionTable, PersistentTranspositionTable, EXACT, LOWER, UPPER
 
 def square_is_on_board(square):
     # Check if the square index is within the valid range (0 to 63)
@@ -15,14 +23,55 @@ def count_material(board: chess.Board, color: chess.Color) -> int:
         material += len(board.pieces(piece_type, color)) * PIECE_VALUES[piece_type]
     return material
 
+MAX_QUIESCENCE_PLY = 8
+MATE_SCORE = 10000  # Score of a checkmate at the root, mates further away score less
+MATE_BOUND = MATE_SCORE - 1000  # Scores beyond this are mates, far above any evaluation
+
+# Selective search parameters (AdvancedAI)
+NULL_WINDOW = 0.01  # Width of a zero window for the fractional evaluation scores
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_VERIFY_PIECES = 2  # Verify null-move cut-offs when the side to move has this few pieces
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 4  # Moves searched at full depth before reductions start
+
+PAWN_ENTRY_BYTES = 320  # 128-bit key plus a tuple of five scores
+
+
+def score_to_tt(score, ply):
+    # The TT keeps mate scores as the distance from the stored node, not from the root,
+    # so they stay right when the node is reached again at another ply
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
 class Player:
     def __init__(self, color, name):
         self.name = name
         self.color = color
+        self.pondering = False  # Whether ponder() should run on the opponent's time
 
     def get_move(self, board):
         pass
 
+    def get_move_until(self, board, stop_flag):
+        # get_move on another thread, returning as soon as it can once stop_flag is set
+        return self.get_move(board)
+
+    def ponder(self, board, stop_flag):
+        # Think on the opponent's time about *board* (opponent to move) until stop_flag is set
+        pass
+
     def clear(self):
         pass
 
@@ -74,10 +123,92 @@ class HumanPlayer(Player):
 class AI(Player):
     def __init__(self, color, name):
         super().__init__(color, name)
+        self.material_weight = 1  # Evaluation units per point of PIECE_VALUES
+        self.delta_margin = 2  # Positional slack allowed by delta pruning
+        self.quiescence_evasions = True  # Search every evasion when in check, without stand-pat
+        self.quiescence_nodes_left = float('inf')  # Past this budget quiescence only stands pat
 
     def get_move(self, board):
         pass
 
+    def make_move(self, board, move):
+        board.push(move)
+
+    def unmake_move(self, board):
+        board.pop()
+
+    def static_evaluate(self, board, alpha=float('-inf'), beta=float('inf')):
+        return self.evaluate_board(board)
+
+    def count_node(self):
+        pass
+
+    def mated_score(self, board):
+        # Score of a position where the side to move is checkmated
+        return self.static_evaluate(board)
+
+    def quiescence(self, board, alpha, beta, qply=0):
+        # Resolve captures and promotions before trusting the static evaluation,
+        # so leaves are not scored in the middle of an exchange (horizon effect).
+        # Scores are from White's point of view, White maximizes.
+        self.count_node()
+        self.quiescence_nodes_left -= 1
+        maximizing_player = board.turn == chess.WHITE
+        in_check = self.quiescence_evasions and qply < MAX_QUIESCENCE_PLY and board.is_check()
+
+        if in_check:
+            # No stand-pat while in check, every evasion has to be tried
+            moves = list(board.legal_moves)
+            if not moves:
+                return self.mated_score(board)
+            stand_pat = best_eval = float('-inf') if maximizing_player else float('inf')
+        else:
+            stand_pat = best_eval = self.static_evaluate(board, alpha, beta)
+            if qply >= MAX_QUIESCENCE_PLY or self.quiescence_nodes_left <= 0:
+                return stand_pat
+            if maximizing_player:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            moves = tactical_moves(board)
+
+        for move in moves:
+            if not in_check:
+                # Delta pruning: even winning the victim cannot bring the score into the window
+                victim = board.piece_type_at(move.to_square)
+                if victim is None and board.is_en_passant(move):
+                    victim = chess.PAWN
+                gain = SEE_VALUES[victim] if victim else 0
+                if move.promotion:
+                    gain += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+                gain = gain * self.material_weight + self.delta_margin
+                if maximizing_player and stand_pat + gain <= alpha:
+                    continue
+                if not maximizing_player and stand_pat - gain >= beta:
+                    continue
+                # SEE pruning: skip captures that lose material on the exchange
+                if see(board, move) < 0:
+                    continue
+
+            self.make_move(board, move)
+            eval = self.quiescence(board, alpha, beta, qply + 1)
+            self.unmake_move(board)
+
+            if maximizing_player:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+
+        return best_eval
+
 class DummyAI(AI):
     def __init__(self, color, name):
         super().__init__(color, name)
@@ -89,6 +220,10 @@ class IntermediateAI(AI):
     def __init__(self, color, name):
         super().__init__(color, name)
         self.max_depth = 4
+        # No clock here: quiescence gets a node budget per move, shared evenly by the
+        # root moves, and skips the check evasions that blow up tactical positions
+        self.quiescence_budget = 2000
+        self.quiescence_evasions = False
 
     def get_move(self, board):
         if board.is_game_over():
@@ -97,9 +232,11 @@ class IntermediateAI(AI):
         random_depth = self.get_dynamic_depth(board)
         move_evaluations = []
 
-        for move in board.legal_moves:
+        moves = list(board.legal_moves)
+        for move in moves:
+            self.quiescence_nodes_left = self.quiescence_budget // len(moves)
             board.push(move)
-            eval = self.alpha_beta(board, random_depth - 1, float('-inf'), float('inf'), not board.turn)
+            eval = self.alpha_beta(board, random_depth - 1, float('-inf'), float('inf'), board.turn == chess.WHITE)
             board.pop()
             move_evaluations.append((move, eval))
 
@@ -118,8 +255,10 @@ class IntermediateAI(AI):
             return 4
 
     def alpha_beta(self, board, depth, alpha, beta, maximizing_player):
-        if depth == 0 or board.is_game_over():
-            return self.evaluate_board(board)
+        # Leaves are scored by evaluate_board, which knows checkmate, stalemate and
+        # insufficient material; inner nodes without legal moves are found by the loops
+        if depth == 0:
+            return self.quiescence(board, alpha, beta)
 
         if maximizing_player:
             max_eval = float('-inf')
@@ -131,6 +270,8 @@ class IntermediateAI(AI):
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break  # Beta cut-off
+            if max_eval == float('-inf'):
+                return self.evaluate_board(board)  # No legal moves
             return max_eval
         else:
             min_eval = float('inf')
@@ -142,11 +283,13 @@ class IntermediateAI(AI):
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break  # Alpha cut-off
+            if min_eval == float('inf'):
+                return self.evaluate_board(board)  # No legal moves
             return min_eval
         
     def evaluate_board(self, board: chess.Board) -> int:
         if board.is_checkmate():
-            return 10000 if board.turn else -10000
+            return -10000 if board.turn else 10000  # The side to move is mated
         if board.is_stalemate():
             return 0
         if board.is_insufficient_material():
@@ -179,262 +322,586 @@ class IntermediateAI(AI):
         return black_king_safety - white_king_safety
 
 class AdvancedAI(AI):
-    def __init__(self, color, name):
+    def __init__(self, color, name, eval_cache_mb=16, tt_mb=32, pawn_cache_mb=2,
+                 disk_cache_path=None, disk_cache_mb=16):
         super().__init__(color, name)
         self.base_max_depth = 5  # Max search depth
-        self.eval_cache = {}  # Cache for evaluated positions
-        self.base_max_move_time_cal = 2
+        self.start_depth = 1  # First iteration of the iterative deepening
+        # Both caches live as long as the player, so they are capped in memory
+        self.eval_cache = LRUCache(eval_cache_mb)  # Static evaluations keyed by Zobrist hash
+        self.tt = TranspositionTable(tt_mb)
+        self.pawn_cache = LRUCache(pawn_cache_mb, PAWN_ENTRY_BYTES)  # Pawn-only evaluation terms
+        # Optional memory-mapped file of root results that survives restarts and can be
+        # shared by several engine processes
+        self.disk_cache = PersistentTranspositionTable(disk_cache_path, disk_cache_mb) if disk_cache_path else None
+        self.disk_cache_min_depth = 3  # Exact root results this deep are played without searching
+        self.orderer = MoveOrderer()
+        self.state = None
+        self.base_max_move_time_cal = 2  # Hard limit per move (seconds)
+        self.timer = TimeManager(self.base_max_move_time_cal)
+        self.material_weight = MIDDLEGAME_WEIGHTS["material"]  # Same in both phases
+        self.delta_margin = 20
+        self.aspiration_window = 25
+        self.max_aspiration_window = 400
+
+        # Selective search switches, so each technique can be A/B tested on its own
+        self.use_pvs = True
+        self.use_null_move = True
+        self.use_lmr = True
+
+        # Lazy evaluation: about the 95th percentile of the weighted terms that come
+        # after the material, piece-square and pawn terms, over random positions
+        self.use_lazy_eval = True
+        self.lazy_margin = 70
+        self.lazy_exits = 0
+        self.full_evals = 0
+
+        # Pondering: search the predicted reply while the opponent thinks
+        self.pondering = True
+        self.max_ponder_time = 30  # Seconds, in case nobody stops the ponder search
+        self.ponder_result = None  # (key after the predicted reply, best move there, seconds searched)
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    def game_phase(self, board):
+        # MAX_PHASE with all pieces on the board down to 0 with kings and pawns only
+        phase = (chess.popcount(board.knights | board.bishops) + 2 * chess.popcount(board.rooks) +
+                 4 * chess.popcount(board.queens))
+        return min(phase, MAX_PHASE)
 
     def get_weights(self, board):
-        total_material = sum(len(board.pieces(pt, chess.WHITE)) + len(board.pieces(pt, chess.BLACK)) for pt in PIECE_VALUES)
-        
-        if total_material < 14:  # Endgame
-            return {
-                "material": 1.5,
-                "king_activity": 0.5,
-                "pawn_structure": 0.5,
-                "pawn_majority": 0.8,
-                "passed_pawn": 1.2,
-                "center_control": 0.3,
-                "piece_mobility": 0.2,
-                "rook_activity": 0.7,
-                "piece_coordination": 0.6,
-                "hanging_pieces": 1.2,
-                "knight_outposts": 0.7,
-                "bishop_pair": 0.5,
-                "tempo": 0.3,
-                "open_files": 0.4,
-                "weak_squares": 0.5,
-                "king_safety": 1.0,
-            }
-        else:  # Opening or Middlegame
-            return {
-                "material": 1.5,
-                "king_activity": 0.5,
-                "pawn_structure": 0.8,
-                "pawn_majority": 0.6,
-                "passed_pawn": 0.8,
-                "center_control": 0.8,
-                "piece_mobility": 0.6,
-                "rook_activity": 0.5,
-                "piece_coordination": 0.6,
-                "hanging_pieces": 1.2,
-                "knight_outposts": 0.7,
-                "bishop_pair": 0.6,
-                "tempo": 0.4,
-                "open_files": 0.4,
-                "weak_squares": 0.5,
-                "king_safety": 1.0,
-            }
+        # Blended weights by term name, for inspection and tuning only;
+        # the evaluation reads the preallocated TAPERED_WEIGHTS vector directly
+        return dict(zip(WEIGHT_TERMS, TAPERED_WEIGHTS[self.game_phase(board)]))
 
     def get_move(self, board):
-        best_move = None
-        best_value = float('-inf') if board.turn == chess.WHITE else float('inf')
+        time_limit = self.base_max_move_time_cal
+
+        # Ponder hit: the opponent played the predicted reply, so the ponder search
+        # already covered this position and filled the TT for it
+        if self.ponder_result is not None:
+            ponder_key, ponder_move, ponder_time = self.ponder_result
+            self.ponder_result = None
+            if ponder_key == zobrist.hash_board(board) and ponder_move is not None and board.is_legal(ponder_move):
+                self.ponder_hits += 1
+                if ponder_time >= time_limit:
+                    return ponder_move  # Already searched for a full move's time
+                time_limit -= ponder_time
+            else:
+                self.ponder_misses += 1  # The search below still starts from the warm TT
 
-        start_time = time.time()
+        if self.disk_cache is not None:
+            cached_move = self.probe_disk_cache(board, zobrist.hash_board(board))
+            if cached_move is not None:
+                return cached_move
 
-        for depth in range(1, self.base_max_depth + 1):
-            if time.time() - start_time > self.base_max_move_time_cal:
-                break
+        best_move, value, completed_depth = self.search(board, time_limit)
+
+        # Same convention as the root TT entry: depth + 1 of the last completed iteration
+        if self.disk_cache is not None and completed_depth:
+            self.disk_cache.store(self.state.key, completed_depth + 1, EXACT, value, best_move)
+        return best_move
+
+    def search(self, board, time_limit):
+        # Iterative deepening with aspiration windows, returns (best move, its value,
+        # depth of the last completed iteration)
+        best_move = None
 
-            current_best_move = None
-            for move in self.order_moves(board):
-                if time.time() - start_time > self.base_max_move_time_cal:
+        self.timer.hard_limit = time_limit
+        self.timer.start()
+        self.state = SearchState(board)
+        self.tt.new_search()
+        self.orderer.new_search()
+
+        current_best_move = None
+        previous_value = None
+        completed_depth = 0
+        try:
+            for depth in range(self.start_depth, self.base_max_depth + 1):
+                # A deeper iteration would not finish before the hard limit anyway
+                if depth > self.start_depth and self.timer.soft_exceeded():
                     break
-                board.push(move)
-                eval = self.alpha_beta(board, depth, float('-inf'), float('inf'), board.turn == chess.WHITE)
-                board.pop()
 
-                if board.turn == chess.WHITE and eval > best_value:
+                # Aspiration window around the previous iteration's score
+                window = self.aspiration_window
+                if previous_value is None:
+                    alpha, beta = float('-inf'), float('inf')
+                else:
+                    alpha, beta = previous_value - window, previous_value + window
+
+                while True:
+                    value, current_best_move = self.search_root(board, depth, alpha, beta)
+                    if value <= alpha:  # Fail low: widen downwards and search again
+                        window *= 2
+                        alpha = value - window if window <= self.max_aspiration_window else float('-inf')
+                    elif value >= beta:  # Fail high: widen upwards and search again
+                        window *= 2
+                        beta = value + window if window <= self.max_aspiration_window else float('inf')
+                    else:
+                        break
+
+                # Only completed iterations are trusted
+                if current_best_move:
+                    best_move = current_best_move
+                    previous_value = value
+                    completed_depth = depth
+        except SearchTimeout:
+            self.state.unwind(board)
+            # The partial iteration is discarded unless nothing completed at all
+            if best_move is None:
+                best_move = current_best_move or next(iter(board.legal_moves), None)
+
+        return best_move, previous_value, completed_depth
+
+    def ponder(self, board, stop_flag):
+        # Runs on the opponent's time, on a copy of the position after our move: searches
+        # the position after the predicted reply until *stop_flag* is set. get_move turns
+        # a hit into an instant (or shortened) move.
+        self.ponder_result = None
+        reply = self.predicted_reply(board)
+        if reply is None:
+            return
+        board = board.copy()
+        board.push(reply)
+        if board.is_game_over():
+            return
+
+        self.timer.stop_flag = stop_flag
+        try:
+            best_move, _, _ = self.search(board, self.max_ponder_time)
+        finally:
+            self.timer.stop_flag = None
+        self.ponder_result = (zobrist.hash_board(board), best_move, self.timer.elapsed())
+
+    def predicted_reply(self, board):
+        # Second move of the principal variation: the TT move of the position after our move
+        entry = self.tt.probe(zobrist.hash_board(board))
+        if entry is None or entry[3] is None or not board.is_legal(entry[3]):
+            return None
+        return entry[3]
+
+    def probe_disk_cache(self, board, key):
+        # Returns the cached move when the disk entry is deep enough to play as is;
+        # a shallower entry still seeds the TT so its move is searched first
+        entry = self.disk_cache.probe(key)
+        if entry is None:
+            return None
+        depth, flag, score, move = entry
+        if move is None or not board.is_legal(move):
+            return None
+        if flag == EXACT and depth >= self.disk_cache_min_depth and not self.may_repeat(board, move):
+            return move
+        self.tt.store(key, depth, flag, score, move)
+        return None
+
+    def may_repeat(self, board, move):
+        # Disk entries know nothing of the game history: when the position or the one
+        # after *move* occurred before, the search has to decide about the draw
+        if board.halfmove_clock < 3:
+            return False
+        if board.is_repetition(2):
+            return True
+        board.push(move)
+        repeated = board.is_repetition(2)
+        board.pop()
+        return repeated
+
+    def search_root(self, board, depth, alpha, beta):
+        maximizing_player = board.turn == chess.WHITE
+        alpha_orig, beta_orig = alpha, beta
+        best_value = float('-inf') if maximizing_player else float('inf')
+        best_move = None
+        in_check = board.is_check()
+
+        # order_moves puts the previous iteration's best move (from the TT) first
+        for index, move in enumerate(self.order_moves(board)):
+            eval = self.search_move(board, move, index, depth + 1, alpha, beta, maximizing_player, in_check)
+
+            if maximizing_player:
+                if eval > best_value:
                     best_value = eval
-                    current_best_move = move
-                elif board.turn == chess.BLACK and eval < best_value:
+                    best_move = move
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_value:
                     best_value = eval
-                    current_best_move = move
+                    best_move = move
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
 
-            if current_best_move:
-                best_move = current_best_move
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(self.state.key, depth + 1, flag, best_value, best_move)
+        return best_value, best_move
+
+    def search_move(self, board, move, index, depth, alpha, beta, maximizing_player, in_check):
+        # Searches one child of a node at *depth*. The first move gets the full window,
+        # later moves a zero window (PVS), quiet late moves a reduced depth (LMR).
+        # Both are re-searched when they turn out to improve on the bound.
+        quiet = not move.promotion and not board.is_capture(move)
+        self.state.push(board, move)
+
+        if index == 0:
+            eval = self.alpha_beta(board, depth - 1, alpha, beta, not maximizing_player)
+        else:
+            reduction = 0
+            if (self.use_lmr and depth >= LMR_MIN_DEPTH and index >= LMR_MIN_MOVES
+                    and quiet and not in_check and not board.is_check()):
+                reduction = 1 if index < 2 * LMR_MIN_MOVES else 2
+
+            # Zero window just above alpha (maximizing) or just below beta (minimizing)
+            if self.use_pvs and maximizing_player and alpha != float('-inf'):
+                low, high = alpha, alpha + NULL_WINDOW
+            elif self.use_pvs and not maximizing_player and beta != float('inf'):
+                low, high = beta - NULL_WINDOW, beta
+            else:
+                low, high = alpha, beta
+
+            eval = self.alpha_beta(board, depth - 1 - reduction, low, high, not maximizing_player)
+            improves = eval > alpha if maximizing_player else eval < beta
+            if reduction and improves:
+                eval = self.alpha_beta(board, depth - 1, low, high, not maximizing_player)
+                improves = eval > alpha if maximizing_player else eval < beta
+            if (low, high) != (alpha, beta) and improves and alpha < eval < beta:
+                eval = self.alpha_beta(board, depth - 1, alpha, beta, not maximizing_player)
+
+        self.state.pop(board)
+        return eval
+
+    def null_move_cutoff(self, board, depth, alpha, beta, maximizing_player):
+        # Give the opponent a free move; if we are still above beta (below alpha
+        # for the minimizing side) the node is very likely a cut-off.
+        if self.non_pawn_pieces(board, board.turn) == 0:
+            return None  # King and pawns only: zugzwang is too likely
+
+        reduced_depth = max(depth - 1 - NULL_MOVE_REDUCTION, 0)
+        if maximizing_player:
+            low, high = beta - NULL_WINDOW, beta
+        else:
+            low, high = alpha, alpha + NULL_WINDOW
 
-        return best_move
+        self.state.push(board, chess.Move.null())
+        eval = self.alpha_beta(board, reduced_depth, low, high, not maximizing_player, allow_null=False)
+        self.state.pop(board)
 
-    def alpha_beta(self, board, depth, alpha, beta, maximizing_player):
-        board_fen = board.fen()  # Using FEN as cache key
-        if board_fen in self.eval_cache:
-            return self.eval_cache[board_fen]  # Return cached evaluation
+        fails = eval >= beta if maximizing_player else eval <= alpha
+        if not fails:
+            return None
 
-        if depth == 0 or board.is_game_over():
-            evaluation = self.evaluate_board(board)
-            self.eval_cache[board_fen] = evaluation  # Cache evaluation
-            return evaluation
+        # Endgames with few pieces: verify with a reduced normal search
+        if self.non_pawn_pieces(board, board.turn) <= NULL_MOVE_VERIFY_PIECES:
+            eval = self.alpha_beta(board, reduced_depth + 1, low, high, maximizing_player, allow_null=False)
+            fails = eval >= beta if maximizing_player else eval <= alpha
+            if not fails:
+                return None
+        # Passing proves no mate, only that the node fails
+        if abs(eval) >= MATE_BOUND:
+            return beta if maximizing_player else alpha
+        return eval
+
+    def non_pawn_pieces(self, board, color):
+        return chess.popcount(board.occupied_co[color] & ~board.pawns & ~board.kings)
+
+    def alpha_beta(self, board, depth, alpha, beta, maximizing_player, allow_null=True):
+        self.timer.tick()
+        key = self.state.key
+
+        # Draws depend on the path, so they are checked before the TT. Checkmate and
+        # stalemate are found by the move loop below, when it has no move to search.
+        if self.is_draw(board):
+            return 0
 
-        legal_moves = list(board.legal_moves)
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_flag, tt_score, tt_move = entry
+            tt_score = score_from_tt(tt_score, self.state.ply)
+            # Only trust results searched at least as deep as we need
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                elif tt_flag == UPPER:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    return tt_score
+        # The bound stored below is relative to the window actually searched,
+        # so it is taken after the TT has narrowed it
+        alpha_orig, beta_orig = alpha, beta
+
+        if depth == 0:
+            return self.quiescence(board, alpha, beta)
+
+        in_check = board.is_check()
+        if (allow_null and self.use_null_move and depth >= NULL_MOVE_MIN_DEPTH and not in_check
+                and alpha != float('-inf') and beta != float('inf')):
+            eval = self.null_move_cutoff(board, depth, alpha, beta, maximizing_player)
+            if eval is not None:
+                return eval
+
+        ply = self.state.ply
+        best_move = None
         if maximizing_player:
-            max_eval = float('-inf')
-            for move in legal_moves:
-                board.push(move)
-                eval = self.alpha_beta(board, depth-1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
+            best_eval = float('-inf')
+            for index, move in enumerate(self.orderer.ordered_moves(board, ply, tt_move)):
+                eval = self.search_move(board, move, index, depth, alpha, beta, True, in_check)
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(board, move, ply, depth)
                     break
-            self.eval_cache[board_fen] = max_eval  # Cache result
-            return max_eval
         else:
-            min_eval = float('inf')
-            for move in legal_moves:
-                board.push(move)
-                eval = self.alpha_beta(board, depth-1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval)
+            best_eval = float('inf')
+            for index, move in enumerate(self.orderer.ordered_moves(board, ply, tt_move)):
+                eval = self.search_move(board, move, index, depth, alpha, beta, False, in_check)
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(board, move, ply, depth)
                     break
-            self.eval_cache[board_fen] = min_eval  # Cache result
-            return min_eval
 
-    def order_moves(self, board):
-        legal_moves = list(board.legal_moves)
-        return sorted(
-            legal_moves,
-            key=lambda move: self.move_priority(board, move),
-            reverse=True
-        )
+        if best_move is None:
+            return self.mated_score(board) if in_check else 0  # Checkmate or stalemate
 
-    def move_priority(self, board, move):
-        board.push(move)
-        evaluation = self.evaluate_board(board)
-        board.pop()
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, score_to_tt(best_eval, self.state.ply), best_move)
+        return best_eval
+
+    def is_draw(self, board):
+        # Repetition of any earlier position, the 75-move rule and insufficient material,
+        # without the move generation of board.is_game_over
+        halfmove_clock = board.halfmove_clock
+        if halfmove_clock >= 150:
+            return True
+        if halfmove_clock >= 4 and self.state.is_repetition(halfmove_clock):
+            return True
+        return not (board.pawns | board.rooks | board.queens) and board.is_insufficient_material()
+
+    def mated_score(self, board):
+        # Shorter mates score higher for the winning side
+        score = MATE_SCORE - self.state.ply
+        return -score if board.turn == chess.WHITE else score
+
+    def count_node(self):
+        self.timer.tick()
+
+    def get_move_until(self, board, stop_flag):
+        # The flag belongs to this search only, so a stop sent before the search
+        # even started is still seen
+        self.timer.stop_flag = stop_flag
+        try:
+            return self.get_move(board)
+        finally:
+            self.timer.stop_flag = None
+
+    def make_move(self, board, move):
+        self.state.push(board, move)
+
+    def unmake_move(self, board):
+        self.state.pop(board)
+
+    def static_evaluate(self, board, alpha=float('-inf'), beta=float('inf')):
+        key = self.state.key
+        evaluation = self.eval_cache.get(key)
+        if evaluation is None:
+            evaluation, exact = self.evaluate(board, self.state, alpha, beta)
+            # Lazy results are only bounds for this window, never cache them
+            if exact:
+                self.eval_cache.put(key, evaluation)
         return evaluation
 
-    def evaluate_board(self, board):
-        weights = self.get_weights(board)
+    def cache_stats(self):
+        return {"eval_cache": self.eval_cache.stats(), "tt": self.tt.stats(), "pawn_cache": self.pawn_cache.stats()}
 
-        white_material = count_material(board, chess.WHITE)
-        black_material = count_material(board, chess.BLACK)
+    def clear(self):
+        self.eval_cache.clear()
+        self.tt.clear()
+        self.pawn_cache.clear()
+
+    def order_moves(self, board):
+        # Root ordering: previous best move first, then the cheap staged ordering
+        entry = self.tt.probe(self.state.key)
+        tt_move = entry[3] if entry is not None else None
+        return list(self.orderer.ordered_moves(board, 0, tt_move))
+
+    def evaluate_board(self, board, state=None):
+        return self.evaluate(board, state)[0]
+
+    def evaluate(self, board, state=None, alpha=float('-inf'), beta=float('inf')):
+        # Returns (score, exact). With lazy evaluation the expensive terms are skipped
+        # when the rest of the score is already outside the (alpha, beta) window by
+        # more than lazy_margin; the score is then only a bound and exact is False.
+        # Inside the search material, piece-square sums and phase are kept up to date
+        # by the SearchState, otherwise they are computed from scratch
+        if state is not None:
+            phase = min(state.phase, MAX_PHASE)
+            material_score = state.material[chess.WHITE] - state.material[chess.BLACK]
+            pst_mg, pst_eg = state.pst_mg, state.pst_eg
+        else:
+            phase = self.game_phase(board)
+            material_score = count_material(board, chess.WHITE) - count_material(board, chess.BLACK)
+            pst_mg = self.evaluate_piece_squares(board, PST_MG)
+            pst_eg = self.evaluate_piece_squares(board, PST_EG)
+        piece_square_score = (pst_mg * phase + pst_eg * (MAX_PHASE - phase)) / MAX_PHASE
+
+        # Middlegame and endgame weights blended by phase (same order as WEIGHT_TERMS)
+        (w_material, w_piece_square, w_pawn_structure, w_king_safety, w_center_control,
+         w_rook_activity, w_passed_pawn, w_bishop_pair, w_knight_outposts, w_open_files,
+         w_weak_squares, w_pawn_majority, w_piece_mobility, w_tempo, w_hanging_pieces,
+         w_piece_coordination) = TAPERED_WEIGHTS[phase]
+
+        # Attack bitboards are computed at most once per node and shared by the terms
+        attack_map = AttackMap(board)
+
+        pawn_structure_score, passed_pawn_score, pawn_majority_score, weak_squares_score = \
+            self.evaluate_pawn_terms(board, attack_map)
+
+        partial_score = (
+            w_material * material_score +
+            w_piece_square * piece_square_score +
+            w_pawn_structure * pawn_structure_score +
+            w_passed_pawn * passed_pawn_score +
+            w_weak_squares * weak_squares_score +
+            w_pawn_majority * pawn_majority_score
+        )
+
+        if self.use_lazy_eval:
+            if partial_score + self.lazy_margin <= alpha:
+                self.lazy_exits += 1
+                return partial_score + self.lazy_margin, False
+            if partial_score - self.lazy_margin >= beta:
+                self.lazy_exits += 1
+                return partial_score - self.lazy_margin, False
 
-        material_score = white_material - black_material
-        pawn_structure_score = self.evaluate_pawn_structure(board)
+        # Piece terms
+        self.full_evals += 1
         king_safety_score = self.evaluate_king_safety(board)
-        center_control_score = self.evaluate_center_control(board)
-        piece_mobility_score = self.evaluate_piece_mobility(board)
+        center_control_score = self.evaluate_center_control(board, attack_map)
         rook_activity_score = self.evaluate_rook_and_queen_activity(board)
-        passed_pawn_score = self.evaluate_passed_pawn(board)
         bishop_pair_score = self.evaluate_bishop_pair(board)
-        knight_outposts_score = self.evaluate_knight_outposts(board)
-        tempo_score = self.evaluate_tempo(board)
+        knight_outposts_score = self.evaluate_knight_outposts(board, attack_map)
         open_files_score = self.evaluate_open_files(board)
-        hanging_pieces_score = self.evaluate_hanging_pieces(board)
-        weak_squares_score = self.evaluate_weak_squares(board)
-        piece_coordination_score = self.evaluate_piece_coordination(board)
-        pawn_majority_score = self.evaluate_pawn_majority(board)
+        piece_mobility_score = self.evaluate_piece_mobility(board, attack_map)
+        tempo_score = self.evaluate_tempo(board, state)
+        hanging_pieces_score = self.evaluate_hanging_pieces(board, attack_map)
+        piece_coordination_score = self.evaluate_piece_coordination(board, attack_map)
 
         total_score = (
-            weights["material"] * material_score +
-            weights["pawn_structure"] * pawn_structure_score +
-            weights["king_safety"] * king_safety_score +
-            weights["center_control"] * center_control_score +
-            weights["piece_mobility"] * piece_mobility_score +
-            weights["rook_activity"] * rook_activity_score +
-            weights["passed_pawn"] * passed_pawn_score +
-            weights["bishop_pair"] * bishop_pair_score +
-            weights["knight_outposts"] * knight_outposts_score +
-            weights["tempo"] * tempo_score +
-            weights["open_files"] * open_files_score +
-            weights["hanging_pieces"] * hanging_pieces_score +
-            weights["weak_squares"] * weak_squares_score +
-            weights["piece_coordination"] * piece_coordination_score +
-            weights["pawn_majority"] * pawn_majority_score
+            partial_score +
+            w_king_safety * king_safety_score +
+            w_center_control * center_control_score +
+            w_rook_activity * rook_activity_score +
+            w_bishop_pair * bishop_pair_score +
+            w_knight_outposts * knight_outposts_score +
+            w_open_files * open_files_score +
+            w_piece_mobility * piece_mobility_score +
+            w_tempo * tempo_score +
+            w_hanging_pieces * hanging_pieces_score +
+            w_piece_coordination * piece_coordination_score
         )
 
-        return total_score
+        return total_score, True
 
-    
-    def piece_square_table(self, piece_type, square, color):
-        table = PIECE_SQUARE_TABLES.get(piece_type)
-        if table is None:
-            return 0  # Return 0 for piece types we don't handle
+    def evaluation_stats(self):
+        evaluations = self.lazy_exits + self.full_evals
+        return {
+            "lazy_exits": self.lazy_exits,
+            "full_evals": self.full_evals,
+            "lazy_rate": self.lazy_exits / evaluations if evaluations else 0.0,
+        }
 
-        # Get the row and column of the square
-        square_index = chess.SQUARES.index(square)
-        row = square_index // 8  # Row (0-7)
-        col = square_index % 8  # Column (0-7)
+    def evaluate_piece_squares(self, board, tables=PST_MG):
+        # Sum of the flat tables over the squares of each piece bitboard, White minus Black
+        score = 0
+        for piece_type in chess.PIECE_TYPES:
+            white_table = tables[chess.WHITE][piece_type]
+            black_table = tables[chess.BLACK][piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+                score += white_table[square]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+                score -= black_table[square]
+        return score
 
-        # For black pieces, reverse the evaluation since black's perspective is flipped
-        if color == chess.BLACK:
-            row = 7 - row  # Reverse the row for black pieces
+    def piece_square_table(self, piece_type, square, color):
+        return PST_MG[color][piece_type][square]
 
-        return table[row][col]
-    
-    def evaluate_pawn_structure(self, board):
-        white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-        black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    def evaluate_pawn_structure(self, board, attack_map=None):
+        attack_map = attack_map or AttackMap(board)
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        return (self.pawn_shape_score(white_pawns, black_pawns) +
+                self.unattacked_pawns_score(white_pawns, black_pawns, attack_map))
 
-        pawn_structure_score = 0
-        # Evaluate isolated pawns (pawns with no same-color pawns on adjacent files)
-        for pawn in white_pawns:
-            file = chess.square_file(pawn)
-            # Check for isolated pawn: no pawns on adjacent files
-            # Check if there's no pawn on the left or right adjacent files
-            adjacent_files = [file - 1, file + 1]
-            isolated = True
-            for f in adjacent_files:
-                if f >= 0 and f <= 7:  # Ensure the file is within bounds (0 to 7)
-                    if any(board.pieces(chess.PAWN, chess.WHITE) & chess.SquareSet(chess.BB_FILES[f])):
-                        isolated = False
-                        break
-            if isolated:
-                pawn_structure_score += 5  # Reward isolated pawns
-
-            # Penalize isolated pawns that are under attack
-            if not board.is_attacked_by(chess.BLACK, pawn):
-                pawn_structure_score -= 5  # Penalize isolated pawns
-
-        for pawn in black_pawns:
-            file = chess.square_file(pawn)
-            # Check for isolated pawn: no pawns on adjacent files
-            # Check if there's no pawn on the left or right adjacent files
-            adjacent_files = [file - 1, file + 1]
-            isolated = True
-            for f in adjacent_files:
-                if f >= 0 and f <= 7:  # Ensure the file is within bounds (0 to 7)
-                    if any(board.pieces(chess.PAWN, chess.BLACK) & chess.SquareSet(chess.BB_FILES[f])):
-                        isolated = False
-                        break
-            if isolated:
-                pawn_structure_score -= 5  # Penalize isolated pawns
+    def pawn_shape_score(self, white_pawns, black_pawns):
+        # The part of the pawn structure that depends on the pawns alone
+        white_files = file_fill(white_pawns)
+        black_files = file_fill(black_pawns)
 
-            # Penalize isolated pawns that are under attack
-            if not board.is_attacked_by(chess.WHITE, pawn):
-                pawn_structure_score += 5  # Reward isolated pawns
+        pawn_structure_score = 0
 
-        # Evaluate doubled pawns (pawns of the same color on the same file)
-        for file in range(8):  # Use range(8) instead of chess.FILES
-            white_pawns_in_file = [pawn for pawn in white_pawns if chess.square_file(pawn) == file]
-            black_pawns_in_file = [pawn for pawn in black_pawns if chess.square_file(pawn) == file]
-            
-            # Penalize doubled pawns (pawns in the same file)
-            if len(white_pawns_in_file) > 1:
-                pawn_structure_score -= 10  # Penalize doubled pawns
-            if len(black_pawns_in_file) > 1:
-                pawn_structure_score += 10  # Reward doubled pawns for Black
-
-        # Evaluate backward pawns (pawns behind the rest of the pawns in the same file)
-        for pawn in white_pawns:
-            file = chess.square_file(pawn)
-            # Check if the pawn is backward (behind other pawns on adjacent files)
-            if file < 7:  # Ensure not the last file
-                if not any(board.pieces(chess.PAWN, chess.WHITE) & chess.SquareSet(chess.BB_FILES[file + 1])):
-                    pawn_structure_score -= 10  # Penalize backward pawns
-
-        for pawn in black_pawns:
-            file = chess.square_file(pawn)
-            # Check if the pawn is backward (behind other pawns on adjacent files)
-            if file < 7:  # Ensure not the last file
-                if not any(board.pieces(chess.PAWN, chess.BLACK) & chess.SquareSet(chess.BB_FILES[file + 1])):
-                    pawn_structure_score += 10  # Reward backward pawns
+        # Isolated pawns: no same-color pawn on an adjacent file
+        white_isolated = white_pawns & ~(shift_east(white_files) | shift_west(white_files))
+        black_isolated = black_pawns & ~(shift_east(black_files) | shift_west(black_files))
+        pawn_structure_score += 5 * chess.popcount(white_isolated)
+        pawn_structure_score -= 5 * chess.popcount(black_isolated)
+
+        # Doubled pawns (more than one pawn of a color on a file)
+        for file_mask in FILES:
+            if chess.popcount(white_pawns & file_mask) > 1:
+                pawn_structure_score -= 10
+            if chess.popcount(black_pawns & file_mask) > 1:
+                pawn_structure_score += 10
+
+        # Backward pawns: no same-color pawn on the next file towards the h-file
+        white_backward = white_pawns & ~chess.BB_FILE_H & ~shift_west(white_files)
+        black_backward = black_pawns & ~chess.BB_FILE_H & ~shift_west(black_files)
+        pawn_structure_score -= 10 * chess.popcount(white_backward)
+        pawn_structure_score += 10 * chess.popcount(black_backward)
 
         return pawn_structure_score
+
+    def unattacked_pawns_score(self, white_pawns, black_pawns, attack_map):
+        # Pawns the opponent does not attack
+        score = -5 * chess.popcount(white_pawns & ~attack_map.attacks(chess.BLACK))
+        score += 5 * chess.popcount(black_pawns & ~attack_map.attacks(chess.WHITE))
+        return score
+
+    def evaluate_pawn_terms(self, board, attack_map):
+        # Pawn-only terms come from the pawn hash table, keyed by both pawn bitboards
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        key = white_pawns | black_pawns << 64
+
+        entry = self.pawn_cache.get(key)
+        if entry is None:
+            entry = (
+                self.pawn_shape_score(white_pawns, black_pawns),
+                self.passed_pawn_score(white_pawns, black_pawns, chess.WHITE),
+                self.passed_pawn_score(black_pawns, white_pawns, chess.BLACK),
+                self.pawn_majority_score(white_pawns, black_pawns),
+                self.weak_squares_score(white_pawns, black_pawns),
+            )
+            self.pawn_cache.put(key, entry)
+        shape_score, white_passed_score, black_passed_score, pawn_majority_score, weak_squares_score = entry
+
+        pawn_structure_score = shape_score + self.unattacked_pawns_score(white_pawns, black_pawns, attack_map)
+        passed_pawn_score = white_passed_score if board.turn == chess.WHITE else black_passed_score
+        return pawn_structure_score, passed_pawn_score, pawn_majority_score, weak_squares_score
     
     def evaluate_king_safety(self, board):
         white_king = board.king(chess.WHITE)
@@ -500,7 +967,8 @@ class AdvancedAI(AI):
 
         return score
 
-    def evaluate_center_control(self, board):
+    def evaluate_center_control(self, board, attack_map=None):
+        attack_map = attack_map or AttackMap(board)
         center_control_score = 0
 
         # Define the center squares
@@ -537,7 +1005,7 @@ class AdvancedAI(AI):
 
         control_bonus = 0
         for square in center_squares:
-            if board.is_attacked_by(board.turn, square):
+            if attack_map.is_attacked_by(board.turn, square):
                 control_bonus += 2  # Bonus for controlling the square
         center_control_score += control_bonus
 
@@ -552,107 +1020,13 @@ class AdvancedAI(AI):
 
         return center_control_score
 
-    def evaluate_piece_mobility(self, board):
-        mobility_score = 0
-        
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                color = piece.color
-                piece_type = piece.piece_type
-                # Calculate the number of legal moves for each piece
-                if piece_type == chess.PAWN:
-                    mobility_score += self.pawn_mobility(square, piece, board)
-                elif piece_type == chess.KNIGHT:
-                    mobility_score += self.knight_mobility(square, piece, board)
-                elif piece_type == chess.BISHOP:
-                    mobility_score += self.bishop_mobility(square, piece, board)
-                elif piece_type == chess.ROOK:
-                    mobility_score += self.rook_mobility(square, piece, board)
-                elif piece_type == chess.QUEEN:
-                    mobility_score += self.queen_mobility(square, piece, board)
-                elif piece_type == chess.KING:
-                    mobility_score += self.king_mobility(square, piece, board)
-
-                # If it's the opponent's turn, subtract the mobility score
-                if color != board.turn:
-                    mobility_score -= mobility_score
-
-        return mobility_score
-
-    def pawn_mobility(self, square, piece, board):
-        mobility_score = 0
-        if piece.piece_type == chess.PAWN:
-            # Ensure pawns on rank 1 (second rank) can move two squares
-            if piece.color == chess.WHITE:
-                if chess.square_rank(square) == 1:  # On the second rank
-                    # Check if two squares ahead are open (rank 3 for white pawns)
-                    if 0 <= square + 16 < 64 and board.piece_at(square + 16) is None:
-                        mobility_score += 1  # Reward double pawn move
-                # Check for single-square moves (standard pawn move)
-                if 0 <= square + 8 < 64 and board.piece_at(square + 8) is None:
-                    mobility_score += 1  # Reward single-square move
-            elif piece.color == chess.BLACK:
-                if chess.square_rank(square) == 6:  # On the second-to-last rank (7th rank for black pawns)
-                    # Check if two squares ahead are open (rank 5 for black pawns)
-                    if 0 <= square - 16 < 64 and board.piece_at(square - 16) is None:
-                        mobility_score += 1  # Reward double pawn move
-                # Check for single-square moves (standard pawn move)
-                if 0 <= square - 8 < 64 and board.piece_at(square - 8) is None:
-                    mobility_score += 1  # Reward single-square move
-
-        return mobility_score
-
-
-    def rook_mobility(self, square, piece, board):
-        mobility = 0
-        for direction in ROOK_DIRECTIONS:
-            target_square = square
-            while True:
-                target_square += direction
-                if not square_is_on_board(target_square):  # Check if the target square is within the board
-                    break
-                if board.piece_at(target_square) is None:  # Empty square
-                    mobility += 1
-                else:  # Blocked by a piece
-                    break
-        return mobility
-
-    def bishop_mobility(self, square, piece, board):
-        mobility = 0
-        for direction in BISHOP_DIRECTIONS:
-            target_square = square
-            while True:
-                target_square += direction
-                if not square_is_on_board(target_square):  # Check if the target square is within the board
-                    break
-                if board.piece_at(target_square) is None:  # Empty square
-                    mobility += 1
-                else:  # Blocked by a piece
-                    break
-        return mobility
-
-    def knight_mobility(self, square, piece, board):
-        mobility = 0
-        for move in KNIGHT_MOVES:
-            target_square = square + move
-            if square_is_on_board(target_square) and board.piece_at(target_square) is None:
-                mobility += 1
-        return mobility
-
-    def queen_mobility(self, square, piece, board):
-        mobility = 0
-        mobility += self.rook_mobility(square, piece, board)  # Rook-like moves
-        mobility += self.bishop_mobility(square, piece, board)  # Bishop-like moves
-        return mobility
-
-    def king_mobility(self, square, piece, board):
-        mobility = 0
-        for move in KING_MOVES:
-            target_square = square + move
-            if square_is_on_board(target_square) and board.piece_at(target_square) is None:
-                mobility += 1
-        return mobility
+    def evaluate_piece_mobility(self, board, attack_map=None):
+        # Safe mobility of the side to move minus that of the opponent
+        attack_map = attack_map or AttackMap(board)
+        us = board.turn
+        them = not us
+        return (mobility(board, us, attack_map.pawn_attacks(them)) -
+                mobility(board, them, attack_map.pawn_attacks(us)))
 
     def evaluate_rook_and_queen_activity(self, board):
         activity_score = 0
@@ -716,36 +1090,22 @@ class AdvancedAI(AI):
         return activity_score
 
     def evaluate_passed_pawn(self, board):
-        passed_pawn_score = 0
         color = board.turn
+        pawns = board.pawns & board.occupied_co[color]
+        return self.passed_pawn_score(pawns, board.pawns & ~pawns, color)
 
-        # Loop through all squares to find passed pawns for the given color
-        for square in range(64):
-            piece = board.piece_at(square)
-            
-            if piece is None or piece.piece_type != chess.PAWN or piece.color != color:
-                continue
-
-            # Check for passed pawn and add the score based on its position
-            if self.is_passed_pawn(board, square, piece.color):
-                passed_pawn_score += self.passed_pawn_position_score(square, piece.color)
-
+    def passed_pawn_score(self, pawns, opponent_pawns, color):
+        passed_pawn_score = 0
+        for square in chess.scan_forward(pawns):
+            # No opponent pawn on the same or adjacent files, at least two ranks above
+            if not opponent_pawns & PASSED_PAWN_MASKS[square]:
+                passed_pawn_score += self.passed_pawn_position_score(square, color)
         return passed_pawn_score
 
     def is_passed_pawn(self, board, square, color):
-        file = chess.square_file(square)
-        
-        # Check for opponent pawns on the same or adjacent files above the current pawn
-        for rank in range(chess.square_rank(square) + 1, 8):
-            opponent_pawns = board.pieces(chess.PAWN, chess.BLACK if color == chess.WHITE else chess.WHITE)
-            for opponent_pawn_square in opponent_pawns:
-                opponent_file = chess.square_file(opponent_pawn_square)
-                opponent_rank = chess.square_rank(opponent_pawn_square)
-
-                # If an opponent pawn is on the same or adjacent file and ahead, the pawn is blocked
-                if opponent_rank > rank and opponent_file in [file - 1, file, file + 1]:
-                    return False
-        return True
+        # No opponent pawn on the same or adjacent files, at least two ranks above
+        opponent_pawns = board.pawns & board.occupied_co[not color]
+        return not opponent_pawns & PASSED_PAWN_MASKS[square]
 
     def passed_pawn_position_score(self, square, color):
         rank = chess.square_rank(square)
@@ -822,53 +1182,35 @@ class AdvancedAI(AI):
         return True  # No pawns found, the diagonal is open
 
     def evaluate_weak_squares(self, board):
-        score = 0
-
-        # Loop through all squares on the board
-        for square in range(64):
-            piece = board.piece_at(square)
-
-            if piece is None:
-                continue
-
-            # Check for isolated pawns
-            if piece.piece_type == chess.PAWN:
-                file = chess.square_file(square)
-                rank = chess.square_rank(square)
-
-                # Check if the pawn is isolated (no friendly pawns in adjacent files)
-                if not self.is_pawn_supported(board, square, piece.color):
-                    # Penalize isolated pawns
-                    score += -10 if piece.color == chess.WHITE else 10
-
-            # Additional evaluation for weak squares with other pieces can be added here
-            # For example, unprotected squares or backward pawns could also be assessed.
-
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        return self.weak_squares_score(white_pawns, black_pawns)
+
+    def weak_squares_score(self, white_pawns, black_pawns):
+        # Penalize pawns without a neighbouring pawn on the same rank
+        score = -10 * chess.popcount(white_pawns & ~self.supported_pawns(white_pawns))
+        score += 10 * chess.popcount(black_pawns & ~self.supported_pawns(black_pawns))
         return score
 
-    def is_pawn_supported(self, board, square, color):
-        file = chess.square_file(square)
-
-        # Determine which pawns to check based on the color
-        if color == chess.WHITE:
-            supporting_pawns = board.pieces(chess.PAWN, chess.WHITE)
-        else:
-            supporting_pawns = board.pieces(chess.PAWN, chess.BLACK)
-        
-        # Check if there is a supporting pawn on adjacent files
-        for supporting_pawn_square in supporting_pawns:
-            supporting_file = chess.square_file(supporting_pawn_square)
-            supporting_rank = chess.square_rank(supporting_pawn_square)
-
-            # Only check pawns that are on the same rank or one rank behind
-            if abs(supporting_file - file) <= 1 and supporting_rank == chess.square_rank(square):
-                return True  # Pawn is supported by a neighboring pawn
+    def supported_pawns(self, pawns):
+        # Squares whose pawn has a friendly pawn on the same rank at most one file away.
+        # As in is_pawn_supported, the pawn itself counts as that neighbour.
+        return pawns | shift_east(pawns) | shift_west(pawns)
 
-        return False  # Pawn is isolated
+    def is_pawn_supported(self, board, square, color):
+        pawns = board.pawns & board.occupied_co[color]
+        return bool(self.supported_pawns(pawns) & chess.BB_SQUARES[square])
 
-    def evaluate_piece_coordination(self, board):
+    def evaluate_piece_coordination(self, board, attack_map=None):
+        attack_map = attack_map or AttackMap(board)
         score = 0
 
+        # Minor and major pieces defended by their own side, up to two defenders each
+        for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+            defenders = attack_map.attacker_counts(color)
+            pieces = board.occupied_co[color] & ~board.pawns & ~board.kings
+            score += sign * 2 * sum(min(defenders[square], 2) for square in chess.scan_forward(pieces))
+
         # Knight coordination: Knights that support each other are valuable
         white_knights = board.pieces(chess.KNIGHT, chess.WHITE)
         black_knights = board.pieces(chess.KNIGHT, chess.BLACK)
@@ -963,29 +1305,18 @@ class AdvancedAI(AI):
         return score
 
     def evaluate_pawn_majority(self, board):
-        score = 0
-
-        # Split the board into two parts: Kingside (files f, g, h) and Queenside (files a, b, c, d)
-        white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-        black_pawns = board.pieces(chess.PAWN, chess.BLACK)
-
-        white_queenside = sum(1 for pawn in white_pawns if chess.square_file(pawn) < 4)
-        white_kingside = sum(1 for pawn in white_pawns if chess.square_file(pawn) >= 4)
-
-        black_queenside = sum(1 for pawn in black_pawns if chess.square_file(pawn) < 4)
-        black_kingside = sum(1 for pawn in black_pawns if chess.square_file(pawn) >= 4)
-
-        # Add score based on pawn majority difference
-        queenside_majority_diff = white_queenside - black_queenside
-        kingside_majority_diff = white_kingside - black_kingside
-
-        # Reward/penalize based on the difference in pawn numbers on each side
-        score += queenside_majority_diff * 5  # Adjust the multiplier for more granular scoring
-        score += kingside_majority_diff * 5  # Adjust the multiplier for more granular scoring
-
-        return score
-
-    def evaluate_knight_outposts(self, board):
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        return self.pawn_majority_score(white_pawns, black_pawns)
+
+    def pawn_majority_score(self, white_pawns, black_pawns):
+        # Pawn count difference on the queenside (files a-d) and the kingside (files e-h)
+        queenside_majority_diff = chess.popcount(white_pawns & QUEENSIDE) - chess.popcount(black_pawns & QUEENSIDE)
+        kingside_majority_diff = chess.popcount(white_pawns & KINGSIDE) - chess.popcount(black_pawns & KINGSIDE)
+        return queenside_majority_diff * 5 + kingside_majority_diff * 5
+
+    def evaluate_knight_outposts(self, board, attack_map=None):
+        attack_map = attack_map or AttackMap(board)
         score = 0
 
         # Get all knights for both colors
@@ -999,7 +1330,7 @@ class AdvancedAI(AI):
             # Ideal outpost squares are on the 5th and 6th ranks (for white, rank 3 and 4 for black)
             if rank in [3, 4]:
                 score += 10  # Reward knight on ideal outpost
-            if self.is_knight_on_safe_square(board, knight_square, chess.WHITE):
+            if self.is_knight_on_safe_square(board, knight_square, chess.WHITE, attack_map):
                 score += 5  # Reward knights that are not easily attacked
 
         # Check black knights
@@ -1009,35 +1340,17 @@ class AdvancedAI(AI):
             # Ideal outpost squares are on the 5th and 6th ranks (for white, rank 3 and 4 for black)
             if rank in [3, 4]:
                 score -= 10  # Penalize opponent's knights on ideal outposts
-            if self.is_knight_on_safe_square(board, knight_square, chess.BLACK):
+            if self.is_knight_on_safe_square(board, knight_square, chess.BLACK, attack_map):
                 score -= 5  # Penalize opponent's knights that are not easily attacked
 
         return score
 
-    def is_knight_on_safe_square(self, board, knight_square, knight_color):
-        file = chess.square_file(knight_square)
-        rank = chess.square_rank(knight_square)
-
+    def is_knight_on_safe_square(self, board, knight_square, knight_color, attack_map=None):
         # A knight on an outpost should not be attacked by an opponent pawn
-        opponent_color = chess.BLACK if knight_color == chess.WHITE else chess.WHITE
-        opponent_pawns = board.pieces(chess.PAWN, opponent_color)
-
-        # Check if the knight is under attack by an opponent pawn (only consider pawns that can attack the knight's position)
-        for opponent_pawn_square in opponent_pawns:
-            opponent_pawn_file = chess.square_file(opponent_pawn_square)
-            opponent_pawn_rank = chess.square_rank(opponent_pawn_square)
-
-            # Check if the opponent's pawn can attack the knight
-            if knight_color == chess.WHITE:
-                if opponent_pawn_rank == rank + 1 and abs(opponent_pawn_file - file) == 1:
-                    return False  # Knight is under attack by an opponent pawn
-            else:
-                if opponent_pawn_rank == rank - 1 and abs(opponent_pawn_file - file) == 1:
-                    return False  # Knight is under attack by an opponent pawn
-
-        return True  # The knight is on a safe square
+        attack_map = attack_map or AttackMap(board)
+        return not attack_map.pawn_attacks(not knight_color) & chess.BB_SQUARES[knight_square]
 
-    def evaluate_tempo(self, board):
+    def evaluate_tempo(self, board, state=None):
         score = 0
 
         if board.turn == chess.WHITE:
@@ -1047,95 +1360,77 @@ class AdvancedAI(AI):
             # Penalize Black for reacting to White's moves
             score -= 10  # Penalize Black for having to react to White's moves
 
-        # Track moves that seem inefficient
-        for move in board.legal_moves:
-            piece = board.piece_at(move.from_square)
-            if piece and piece.piece_type == chess.PAWN:
-                # Penalize for moving pawns unnecessarily (moving pawns multiple times in the opening can waste tempo)
-                if self.is_pawn_moved_twice(board, move.from_square):
-                    score -= 5  # Penalize for moving the same pawn twice
-
-            if piece and piece.piece_type in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
-                # Penalize repeated moves (if the same piece moves more than once in the opening)
-                if self.has_piece_moved_twice(board, piece):
-                    score -= 5  # Penalize for moving the same piece twice
+        # Move counters per square, kept by the SearchState during the search
+        if state is not None:
+            from_counts, step_counts = state.from_counts, state.step_counts
+        else:
+            from_counts, step_counts = move_counts(board.move_stack)
+
+        # Track moves that seem inefficient: every legal move of a piece on a square in
+        # the penalized set costs 5
+        us = board.turn
+        penalized = 0
+
+        # Penalize for moving pawns unnecessarily (moving pawns multiple times in the opening can waste tempo)
+        for square in chess.scan_forward(board.pawns & board.occupied_co[us] & (chess.BB_RANK_2 | chess.BB_RANK_7)):
+            if self.is_pawn_moved_twice(square, step_counts):
+                penalized |= chess.BB_SQUARES[square]
+
+        # Penalize repeated moves (if the same piece moves more than once in the opening)
+        for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+            pieces = board.pieces_mask(piece_type, us)
+            if pieces and self.has_piece_moved_twice(pieces, from_counts):
+                penalized |= pieces
+
+        if penalized:
+            score -= 5 * sum(1 for _ in board.generate_legal_moves(penalized))
         return score
 
-    def is_pawn_moved_twice(self, board, pawn_square):
-        # Check if a pawn has already moved once (and now moves a second time)
-        if chess.square_rank(pawn_square) == 6 or chess.square_rank(pawn_square) == 1:
-            # Pawn is on its starting position, check if it's moved
-            for move in board.move_stack:
-                if move.from_square == pawn_square and move.to_square == pawn_square + 8:
-                    return True  # Pawn has moved twice
-        return False
-
-    def has_piece_moved_twice(self, board, piece):
-        # Check if a piece has moved twice in the opening phase
-        move_count = 0
-        for move in board.move_stack:
-            if board.piece_at(move.from_square) == piece:
-                move_count += 1
-            if move_count > 1:
-                return True
-        return False
+    def is_pawn_moved_twice(self, pawn_square, step_counts):
+        # A pawn on its starting rank that already stepped from this square before
+        return step_counts[pawn_square] > 0
 
-    def evaluate_open_files(self, board):
-        score = 0
+    def has_piece_moved_twice(self, pieces, from_counts):
+        # More than one move in the game started from a square now holding one of these pieces
+        return sum(from_counts[square] for square in chess.scan_forward(pieces)) > 1
 
-        # Loop through each file (0-7)
-        for file in range(8):
-            # Get the pawns for both sides on the current file
-            white_pawns = board.pieces(chess.PAWN, chess.WHITE).intersection(chess.BB_FILES[file])
-            black_pawns = board.pieces(chess.PAWN, chess.BLACK).intersection(chess.BB_FILES[file])
-
-            # Check if the file is open (no pawns) or semi-open (one color has pawns)
-            is_open_file = len(white_pawns) == 0 and len(black_pawns) == 0
-            is_semi_open_file = (len(white_pawns) == 0 and len(black_pawns) > 0) or (len(white_pawns) > 0 and len(black_pawns) == 0)
-
-            # For open files, reward rooks and queens
-            if is_open_file:
-                score += self.evaluate_file_control(board, file, chess.WHITE)
-                score -= self.evaluate_file_control(board, file, chess.BLACK)
-            elif is_semi_open_file:
-                if len(white_pawns) == 0:
-                    score = score + self.evaluate_file_control(board, file, chess.WHITE)
-                else:
-                    score = score - self.evaluate_file_control(board, file, chess.BLACK)
+    def evaluate_open_files(self, board):
+        # Rooks and queens on a file without own pawns (open or semi-open) are rewarded
+        heavy_pieces = board.rooks | board.queens
+        white_pawn_files = file_fill(board.pawns & board.occupied_co[chess.WHITE])
+        black_pawn_files = file_fill(board.pawns & board.occupied_co[chess.BLACK])
 
+        score = self.evaluate_file_control(heavy_pieces & board.occupied_co[chess.WHITE] & ~white_pawn_files, chess.WHITE)
+        score -= self.evaluate_file_control(heavy_pieces & board.occupied_co[chess.BLACK] & ~black_pawn_files, chess.BLACK)
         return score
 
-    def evaluate_file_control(self, board, file, color):
+    def evaluate_file_control(self, pieces, color):
         score = 0
+        for piece_square in chess.scan_forward(pieces):
+            # Reward pieces controlling open or semi-open files, plus a rank-based bonus
+            rank = piece_square >> 3
+            score += 10 + (2 * (7 - rank) if color == chess.WHITE else 2 * rank)
+        return score
 
-        # Get rooks and queens for the given color on the specified file
-        pieces = board.pieces(chess.ROOK, color).union(board.pieces(chess.QUEEN, color))
-
-        for piece_square in pieces:
-            if chess.square_file(piece_square) == file:
-                # Reward pieces controlling open or semi-open files
-                score += 10
-
-                # Optionally add a rank-based bonus for rooks/queens in advanced positions
-                rank = chess.square_rank(piece_square)
-                if color == chess.WHITE:
-                    score += 2 * (7 - rank)  # Higher rank = more control for White
-                else:
-                    score += 2 * rank  # Higher rank = more control for Black
-
-        return score if score != 0 else 0  # Ensure a numeric return value
+    def evaluate_hanging_pieces(self, board, attack_map=None):
+        # Pieces attacked by the opponent more often than they are defended
+        # (undefended attacked pieces included)
+        attack_map = attack_map or AttackMap(board)
+        white_counts = attack_map.attacker_counts(chess.WHITE)
+        black_counts = attack_map.attacker_counts(chess.BLACK)
+        white_hanging = black_hanging = 0
+        for square in chess.scan_forward(board.occupied_co[chess.WHITE] & attack_map.attacks(chess.BLACK)):
+            if black_counts[square] > white_counts[square]:
+                white_hanging |= chess.BB_SQUARES[square]
+        for square in chess.scan_forward(board.occupied_co[chess.BLACK] & attack_map.attacks(chess.WHITE)):
+            if white_counts[square] > black_counts[square]:
+                black_hanging |= chess.BB_SQUARES[square]
 
-    def evaluate_hanging_pieces(self, board):
         score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                if piece.color == chess.WHITE and not board.is_attacked_by(chess.WHITE, square):
-                    if board.is_attacked_by(chess.BLACK, square):
-                        score -= PIECE_VALUES[piece.piece_type]
-                elif piece.color == chess.BLACK and not board.is_attacked_by(chess.BLACK, square):
-                    if board.is_attacked_by(chess.WHITE, square):
-                        score += PIECE_VALUES[piece.piece_type]
+        for piece_type in chess.PIECE_TYPES:
+            pieces = board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)
+            score -= PIECE_VALUES[piece_type] * chess.popcount(white_hanging & pieces)
+            score += PIECE_VALUES[piece_type] * chess.popcount(black_hanging & pieces)
         return score
 
 
@@ -1148,11 +1443,28 @@ class Stockfish(AI):
         self.engine.configure({"Threads": 2})
         self.analysis_time = 0.1
 
+        # With pondering on, the engine keeps searching its expected reply after each
+        # move (python-chess sends "go ponder"), so a hit finds a warm hash table
+        self.pondering = True
+        self.ponder_hit_time_ratio = 0.5  # Share of analysis_time used after a ponder hit
+        self.ponder_fen = None  # Position after the move and the predicted reply
+
     def get_move(self, board):
         if board.is_game_over():
             return None
-        
-        result = self.engine.play(board, chess.engine.Limit(time=self.analysis_time))
+
+        time_limit = self.analysis_time
+        if self.ponder_fen is not None and board.fen() == self.ponder_fen:
+            time_limit *= self.ponder_hit_time_ratio
+
+        result = self.engine.play(board, chess.engine.Limit(time=time_limit), ponder=self.pondering)
+
+        self.ponder_fen = None
+        if self.pondering and result.ponder is not None:
+            predicted = board.copy(stack=False)
+            predicted.push(result.move)
+            predicted.push(result.ponder)
+            self.ponder_fen = predicted.fen()
         return result.move
     
     def clear(self):
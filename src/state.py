@@ -0,0 +1,140 @@
+import chess
+import zobrist
+from data import PIECE_VALUES, PST_MG, PST_EG, PHASE_VALUES
+
+
+def move_counts(moves):
+    # Per-square move counters over a move sequence: moves starting on each square,
+    # and single steps up the board (square to square + 8) starting on each square
+    from_counts = [0] * 64
+    step_counts = [0] * 64
+    for move in moves:
+        from_counts[move.from_square] += 1
+        if move.to_square == move.from_square + 8:
+            step_counts[move.from_square] += 1
+    return from_counts, step_counts
+
+
+def history_keys(board):
+    # Zobrist keys of the positions before *board* back to its last capture or pawn
+    # move, oldest first; earlier positions can never occur again
+    board = board.copy()
+    keys = []
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        board.pop()
+        keys.append(zobrist.hash_board(board))
+    keys.reverse()
+    return keys
+
+
+class SearchState:
+    # Incrementally updated position data for the search, kept in sync with
+    # the board by routing every push/pop of the search through this object.
+    def __init__(self, board: chess.Board):
+        self.key = 0
+        self.material = [0, 0]  # PIECE_VALUES sum, indexed by color
+        # Middlegame and endgame piece-square sums, White minus Black
+        self.pst_mg = 0
+        self.pst_eg = 0
+        self.phase = 0  # Sum of PHASE_VALUES, can exceed MAX_PHASE after promotions
+        for square, piece in board.piece_map().items():
+            self.add_piece(piece.piece_type, piece.color, square)
+        self.key = zobrist.hash_board(board)  # Also covers castling, en passant and side to move
+        # Seeded from the game history once, then updated on every push/pop
+        self.from_counts, self.step_counts = move_counts(board.move_stack)
+        self.history = history_keys(board)  # Keys of the positions before the current one
+        self.stack = []
+
+    @property
+    def ply(self):
+        # Distance from the root of the search
+        return len(self.stack)
+
+    def is_repetition(self, halfmove_clock):
+        # Whether the current position occurred before; only positions with the same side
+        # to move within the last *halfmove_clock* plies can be equal
+        history = self.history
+        key = self.key
+        for index in range(len(history) - 2, max(len(history) - halfmove_clock, 0) - 1, -2):
+            if history[index] == key:
+                return True
+        return False
+
+    def add_piece(self, piece_type, color, square):
+        self.key ^= zobrist.PIECE_KEYS[color][piece_type][square]
+        self.material[color] += PIECE_VALUES[piece_type]
+        self.phase += PHASE_VALUES[piece_type]
+        if color == chess.WHITE:
+            self.pst_mg += PST_MG[color][piece_type][square]
+            self.pst_eg += PST_EG[color][piece_type][square]
+        else:
+            self.pst_mg -= PST_MG[color][piece_type][square]
+            self.pst_eg -= PST_EG[color][piece_type][square]
+
+    def remove_piece(self, piece_type, color, square):
+        self.key ^= zobrist.PIECE_KEYS[color][piece_type][square]
+        self.material[color] -= PIECE_VALUES[piece_type]
+        self.phase -= PHASE_VALUES[piece_type]
+        if color == chess.WHITE:
+            self.pst_mg -= PST_MG[color][piece_type][square]
+            self.pst_eg -= PST_EG[color][piece_type][square]
+        else:
+            self.pst_mg += PST_MG[color][piece_type][square]
+            self.pst_eg += PST_EG[color][piece_type][square]
+
+    def push(self, board, move):
+        self.stack.append((self.key, self.material[chess.WHITE], self.material[chess.BLACK],
+                           self.pst_mg, self.pst_eg, self.phase))
+        self.history.append(self.key)
+        self.key ^= zobrist.SIDE_KEY
+        self.key ^= zobrist.castling_key(board.castling_rights) ^ zobrist.ep_key(board.ep_square)
+        if move:
+            self.apply_move(board, move)
+        self.count_move(move, 1)
+        board.push(move)
+        self.key ^= zobrist.castling_key(board.castling_rights) ^ zobrist.ep_key(board.ep_square)
+
+    def apply_move(self, board, move):
+        # Piece changes of *move*, read from the board before it is pushed
+        us = board.turn
+        them = not us
+        from_square = move.from_square
+        to_square = move.to_square
+        piece_type = board.piece_type_at(from_square)
+        self.remove_piece(piece_type, us, from_square)
+
+        if piece_type == chess.KING and board.is_castling(move):
+            rank = from_square & ~7
+            if (to_square & 7) > (from_square & 7):
+                king_to, rook_from, rook_to = rank + 6, rank + 7, rank + 5
+            else:
+                king_to, rook_from, rook_to = rank + 2, rank, rank + 3
+            self.add_piece(chess.KING, us, king_to)
+            self.remove_piece(chess.ROOK, us, rook_from)
+            self.add_piece(chess.ROOK, us, rook_to)
+            return
+
+        captured = board.piece_type_at(to_square)
+        if captured:
+            self.remove_piece(captured, them, to_square)
+        elif piece_type == chess.PAWN and to_square == board.ep_square:
+            self.remove_piece(chess.PAWN, them, to_square - 8 if us == chess.WHITE else to_square + 8)
+
+        self.add_piece(move.promotion or piece_type, us, to_square)
+
+    def count_move(self, move, delta):
+        # Null moves are counted too, they are on the board's move stack like any other move
+        self.from_counts[move.from_square] += delta
+        if move.to_square == move.from_square + 8:
+            self.step_counts[move.from_square] += delta
+
+    def pop(self, board):
+        self.count_move(board.pop(), -1)
+        self.history.pop()
+        (self.key, self.material[chess.WHITE], self.material[chess.BLACK],
+         self.pst_mg, self.pst_eg, self.phase) = self.stack.pop()
+
+    def unwind(self, board):
+        # Take back everything pushed by an aborted search
+        while self.stack:
+            self.pop(board)
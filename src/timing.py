@@ -0,0 +1,41 @@
+import time
+
+class SearchTimeout(Exception):
+    # Raised from inside the search tree when the hard time limit is reached
+    pass
+
+class TimeManager:
+    def __init__(self, hard_limit, soft_ratio=0.5, check_interval=256):
+        self.hard_limit = hard_limit  # Never search longer than this (seconds)
+        self.soft_ratio = soft_ratio  # Do not start a new iteration after this share of it
+        # Polling the clock is comparatively expensive, so only do it every N nodes
+        self.check_mask = check_interval - 1
+        self.start_time = time.time()
+        self.nodes = 0
+        self.stopped = False
+        self.stop_flag = None  # Optional shared flag (e.g. a multiprocessing Event) that also stops the search
+
+    def start(self):
+        self.start_time = time.time()
+        self.nodes = 0
+        self.stopped = False
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes & self.check_mask == 0:
+            if (self.stopped or time.time() - self.start_time > self.hard_limit or
+                    (self.stop_flag is not None and self.stop_flag.is_set())):
+                self.stopped = True
+                raise SearchTimeout()
+
+    def soft_exceeded(self):
+        if self.stop_flag is not None and self.stop_flag.is_set():
+            return True
+        return self.stopped or self.elapsed() > self.hard_limit * self.soft_ratio
+
+    def stop(self):
+        # Ask a running search to abort at its next poll
+        self.stopped = True
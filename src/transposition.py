@@ -0,0 +1,310 @@
+import os
+import mmap
+import struct
+import chess
+from multiprocessing import shared_memory
+
+try:
+    import fcntl
+    LOCK_EX, LOCK_UN = fcntl.LOCK_EX, fcntl.LOCK_UN
+except ImportError:
+    # No flock on Windows; there the file is sized without a lock
+    fcntl = None
+    LOCK_EX = LOCK_UN = None
+
+
+def lock(file, operation):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), operation)
+
+
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1  # fail-high: the real score is >= stored score
+UPPER = 2  # fail-low: the real score is <= stored score
+
+# Approximate cost of one slot: six list pointers plus the key, score and move objects
+ENTRY_BYTES = 176
+MB = 1024 * 1024
+
+# Packed slot of the shared and on-disk tables: three 64-bit words (check, data,
+# score bits), check = key ^ data ^ score bits
+PACKED_ENTRY_WORDS = 3
+PACKED_ENTRY_BYTES = 8 * PACKED_ENTRY_WORDS
+HEADER_BYTES = 8  # Shared block header: one word with the search generation
+SCORE_BITS = struct.Struct('<d')
+WORD = struct.Struct('<Q')
+
+class TranspositionTable:
+    def __init__(self, budget_mb=32):
+        # Size is rounded down to a power of two so the index is a simple mask
+        size = max(1, int(budget_mb * MB) // ENTRY_BYTES)
+        self.size = 1 << (size.bit_length() - 1)
+        self.mask = self.size - 1
+        self.allocate()
+
+    def allocate(self):
+        # Preallocated parallel slots, one entry per index
+        self.keys = [0] * self.size
+        self.depths = [-1] * self.size
+        self.flags = [EXACT] * self.size
+        self.scores = [0.0] * self.size
+        self.moves = [None] * self.size
+        self.ages = [0] * self.size
+
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.filled = 0
+
+    def new_search(self):
+        # Entries from older searches become the first candidates for replacement
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        index = key & self.mask
+        if self.keys[index] == key and self.depths[index] >= 0:
+            self.hits += 1
+            return self.depths[index], self.flags[index], self.scores[index], self.moves[index]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self.mask
+        stored_key = self.keys[index]
+
+        # Depth-preferred replacement with aging: keep a deeper entry of the
+        # current search unless it is for the same position.
+        if (stored_key != key and self.ages[index] == self.generation
+                and self.depths[index] > depth):
+            return
+
+        # Keep the old best move when the new result has none (fail-low)
+        if stored_key == key:
+            if move is None:
+                move = self.moves[index]
+        elif self.depths[index] < 0:
+            self.filled += 1
+        else:
+            self.evictions += 1
+
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.scores[index] = score
+        self.moves[index] = move
+        self.ages[index] = self.generation
+
+    def clear(self):
+        self.allocate()
+
+    @property
+    def resident_bytes(self):
+        return self.filled * ENTRY_BYTES
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self.filled,
+            "resident_mb": self.resident_bytes / MB,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def pack_move(move):
+    # 16 bits: from, to, promotion and a presence bit, 0 for no move
+    if move is None:
+        return 0
+    return 0x8000 | move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def unpack_move(bits):
+    if not bits:
+        return None
+    return chess.Move(bits & 63, (bits >> 6) & 63, (bits >> 12) & 7 or None)
+
+
+class PackedTranspositionTable:
+    # Same interface as TranspositionTable, but the slots are packed 64-bit words in a
+    # buffer that other processes can see (shared memory or a memory-mapped file).
+    # There are no locks: every slot stores key ^ data ^ score next to data and score,
+    # and a probe whose words do not XOR back to the key (an empty slot, another
+    # position, or a write torn by a concurrent store) is simply a miss.
+    def __init__(self, size):
+        self.size = size  # Power of two
+        self.mask = self.size - 1
+        self.buffer = None
+        self.words = None
+
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.filled = 0
+
+    def attach(self, buffer):
+        self.buffer = buffer
+        self.words = memoryview(buffer).cast('Q')
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def read(self, index):
+        # (key, depth, flag, age, move bits, score), or None for an empty slot
+        base = index * PACKED_ENTRY_WORDS
+        words = self.words
+        check, data, score_bits = words[base], words[base + 1], words[base + 2]
+        if not data & 0xFF:
+            return None
+        key = check ^ data ^ score_bits
+        return (key, (data & 0xFF) - 1, (data >> 8) & 3, (data >> 10) & 0xFF, data >> 18,
+                SCORE_BITS.unpack(WORD.pack(score_bits))[0])
+
+    def probe(self, key):
+        entry = self.read(key & self.mask)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2], entry[5], unpack_move(entry[4])
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self.mask
+        entry = self.read(index)
+        move_bits = pack_move(move)
+
+        # Same depth-preferred replacement with aging as TranspositionTable
+        if entry is not None:
+            stored_key, stored_depth, _, stored_age, stored_move_bits, _ = entry
+            if stored_key != key and stored_age == self.generation and stored_depth > depth:
+                return
+            if stored_key == key:
+                if move is None:
+                    move_bits = stored_move_bits
+            else:
+                self.evictions += 1
+        else:
+            self.filled += 1
+
+        data = min(depth + 1, 0xFF) | flag << 8 | self.generation << 10 | move_bits << 18
+        score_bits = WORD.unpack(SCORE_BITS.pack(score))[0]
+        base = index * PACKED_ENTRY_WORDS
+        words = self.words
+        words[base + 1] = data
+        words[base + 2] = score_bits
+        words[base] = key ^ data ^ score_bits
+
+    def clear(self):
+        self.words.cast('B')[:] = bytes(self.size * PACKED_ENTRY_BYTES)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.filled = 0
+
+    @property
+    def resident_bytes(self):
+        return self.size * PACKED_ENTRY_BYTES  # Allocated up front
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self.filled,
+            "resident_mb": self.resident_bytes / MB,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def packed_size(budget_mb):
+    size = max(1, int(budget_mb * MB) // PACKED_ENTRY_BYTES)
+    return 1 << (size.bit_length() - 1)
+
+
+class SharedTranspositionTable(PackedTranspositionTable):
+    # Packed table in a multiprocessing.shared_memory block, so several search
+    # processes use one table. Created when *name* is None, attached otherwise.
+    # The generation is kept in the block's header word, so every process ages the
+    # entries by the same counter.
+    def __init__(self, budget_mb=32, name=None):
+        self.header = None
+        super().__init__(packed_size(budget_mb))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + self.size * PACKED_ENTRY_BYTES)
+        else:
+            # Attached by child processes, which share the creator's resource tracker,
+            # so the block is still freed exactly once, by the creator
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.header = self.shm.buf[:HEADER_BYTES].cast('Q')
+        self.attach(self.shm.buf[HEADER_BYTES:])
+
+    @property
+    def generation(self):
+        return self.header[0] if self.header is not None else 0
+
+    @generation.setter
+    def generation(self, value):
+        if self.header is not None:
+            self.header[0] = value
+
+    def new_search(self):
+        # Helper searches start whenever their task does, so searching never ages the
+        # table; the main searcher calls advance_generation once per move
+        pass
+
+    def advance_generation(self):
+        self.header[0] = (self.header[0] + 1) & 0xFF
+
+    def close(self):
+        # Detach from the block; the creating process also frees it
+        self.words.release()
+        self.buffer.release()
+        self.header.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class PersistentTranspositionTable(PackedTranspositionTable):
+    # Packed table in a fixed-size file opened with mmap, so results survive restarts.
+    # Probes read the mapped pages in place, and since every slot verifies itself any
+    # number of engine processes can map the same file at once.
+    # Entries are never aged: the generation stays 0, so replacement is purely depth-preferred.
+    def __init__(self, path, budget_mb=16):
+        self.path = path
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), "r+b")
+        # Sizing happens under an exclusive lock so a second process can't truncate
+        # the file while the first is still deciding on (or mapping) its size
+        lock(self.file, LOCK_EX)
+        try:
+            size = packed_size(budget_mb)
+            # An existing file keeps its own size if it holds a valid table
+            file_size = os.fstat(self.file.fileno()).st_size
+            entries = file_size // PACKED_ENTRY_BYTES
+            if file_size == entries * PACKED_ENTRY_BYTES and entries and entries & (entries - 1) == 0:
+                size = entries
+            elif file_size != size * PACKED_ENTRY_BYTES:
+                self.file.truncate(size * PACKED_ENTRY_BYTES)
+            super().__init__(size)
+            self.attach(mmap.mmap(self.file.fileno(), size * PACKED_ENTRY_BYTES))
+        finally:
+            lock(self.file, LOCK_UN)
+
+    def new_search(self):
+        pass
+
+    def close(self):
+        self.words.release()
+        self.buffer.flush()
+        self.buffer.close()
+        self.file.close()
@@ -62,8 +62,6 @@ class Menu:
             pygame.draw.rect(self.screen, BUTTON_COL2, self.exit_btn_rect)
             exit_text_rect = self.exit_text.get_rect(center=self.exit_btn_rect.center)
             self.screen.blit(self.exit_text, exit_text_rect)
-            
-        pygame.display.flip()
 
     def handle_events(self, events):
         """Handles menu-related events."""
@@ -125,8 +123,6 @@ class PickLevelUI:
             pygame.draw.rect(self.screen, BUTTON_COL2, self.exit_btn_rect)
             exit_text_rect = self.exit_text.get_rect(center=self.exit_btn_rect.center)
             self.screen.blit(self.exit_text, exit_text_rect)
-            
-        pygame.display.flip()
 
     def handle_events(self, events):
         for event in events:
@@ -185,13 +181,13 @@ class InGameUI:
         self.screen.blit(self.pause_text, self.pause_text.get_rect(center=self.pause_btn.center))
         self.screen.blit(self.exit_text, self.exit_text.get_rect(center=self.exit_btn.center))
         self.screen.blit(self.turn_text, (0, self.game.HEIGHT // 2))
-        if self.game.board.is_game_over():
-            self.handle_game_over()
+        self.handle_game_over()
 
     def handle_game_over(self):
-        if not self.game.board.is_game_over():
+        outcome = self.game.board.game_outcome()
+        if outcome is None:
             return
-        result = self.game.board.board.result()  # This will return '1-0', '0-1', or '1/2-1/2'
+        result = outcome.result()  # This will return '1-0', '0-1', or '1/2-1/2'
         if result == '1-0':
             message = f"{self.players[0].name} wins!"  # White wins
         elif result == '0-1':
@@ -203,8 +199,6 @@ class InGameUI:
         text_rect = text.get_rect(center=(self.game.WIDTH // 2, self.game.HEIGHT // 2))
         self.screen.blit(text, text_rect)
 
-        pygame.display.flip()
-
     def handle_events(self, events):
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -0,0 +1,40 @@
+import random
+import chess
+
+# Fixed seed so every process (and every run) derives the same keys
+_rng = random.Random(0x5EED)
+
+def _random_key():
+    return _rng.getrandbits(64)
+
+# PIECE_KEYS[color][piece_type][square], color is False (black) / True (white)
+PIECE_KEYS = [[[_random_key() for _ in range(64)] for _ in range(7)] for _ in range(2)]
+CASTLING_KEYS = [_random_key() for _ in range(64)]  # indexed by rook square (A1, H1, A8, H8)
+EP_KEYS = [_random_key() for _ in range(8)]  # indexed by file of the en passant square
+SIDE_KEY = _random_key()  # xor-ed in when white is to move
+
+CASTLING_MASK = chess.BB_A1 | chess.BB_H1 | chess.BB_A8 | chess.BB_H8
+
+
+def castling_key(castling_rights):
+    key = 0
+    for square in chess.scan_forward(castling_rights & CASTLING_MASK):
+        key ^= CASTLING_KEYS[square]
+    return key
+
+
+def ep_key(ep_square):
+    return EP_KEYS[ep_square & 7] if ep_square is not None else 0
+
+
+def hash_board(board: chess.Board) -> int:
+    # Full recomputation, only needed once per search (the root)
+    key = 0
+    for square, piece in board.piece_map().items():
+        key ^= PIECE_KEYS[piece.color][piece.piece_type][square]
+    key ^= castling_key(board.castling_rights)
+    key ^= ep_key(board.ep_square)
+    if board.turn == chess.WHITE:
+        key ^= SIDE_KEY
+    return key
+